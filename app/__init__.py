@@ -1,5 +1,7 @@
 # app/__init__.py
 
+import os
+import sys
 from flask import Flask
 from flask_sqlalchemy import SQLAlchemy
 from flask_socketio import SocketIO
@@ -12,15 +14,100 @@ socketio = SocketIO()
 login_manager = LoginManager()
 migrate = Migrate()
 
+def engine_options(app):
+    """SQLAlchemy pool settings sized from config (SQLite keeps its defaults)"""
+    options = dict(app.config.get('SQLALCHEMY_ENGINE_OPTIONS') or {})
+    if app.config['SQLALCHEMY_DATABASE_URI'].startswith('sqlite'):
+        return options
+    
+    options.setdefault('pool_size', app.config.get('DB_POOL_SIZE', 20))
+    options.setdefault('max_overflow', app.config.get('DB_MAX_OVERFLOW', 10))
+    options.setdefault('pool_timeout', app.config.get('DB_POOL_TIMEOUT', 10))
+    options.setdefault('pool_recycle', app.config.get('DB_POOL_RECYCLE', 280))
+    options.setdefault('pool_pre_ping', True)
+    return options
+
+def socketio_queue_options(app):
+    """Message-queue settings so several Socket.IO workers share rooms"""
+    url = app.config.get('SOCKETIO_MESSAGE_QUEUE')
+    if not url:
+        return {}
+    
+    channel = app.config.get('SOCKETIO_CHANNEL', 'brtanya')
+    if url.startswith('filesystem://'):
+        # Local stand-in for a broker: Kombu's filesystem transport, shared
+        # by every worker on the same box through a spool directory
+        import socketio as python_socketio
+        folder = url[len('filesystem://'):] or os.path.join(os.getcwd(), 'instance', 'socketio-queue')
+        os.makedirs(folder, exist_ok=True)
+        folders = {'data_folder_in': folder, 'data_folder_out': folder, 'control_folder': folder}
+        manager = python_socketio.KombuManager(
+            'filesystem://', channel=channel,
+            connection_options={'transport_options': folders}
+        )
+        return {'client_manager': manager}
+    
+    # redis://, amqp://, kafka://, zmq+tcp:// ... handled by Flask-SocketIO
+    return {'message_queue': url, 'channel': channel}
+
+def socketio_async_mode(app):
+    """Resolve SOCKETIO_ASYNC_MODE; eventlet is only used once monkey-patched"""
+    mode = app.config.get('SOCKETIO_ASYNC_MODE') or None
+    patched = 'eventlet' in sys.modules and sys.modules['eventlet'].patcher.is_monkey_patched('socket')
+    if mode is None:
+        return 'eventlet' if patched else 'threading'
+    if mode == 'eventlet' and not patched:
+        # Unpatched sockets and locks would block the whole green-thread hub
+        raise RuntimeError("SOCKETIO_ASYNC_MODE='eventlet' requires eventlet.monkey_patch() "
+                           "before the app is imported (see run.py)")
+    return mode
+
 def create_app(config_class=Config):
     app = Flask(__name__)
     app.config.from_object(config_class)
     
     # Initialize extensions
+    app.config['SQLALCHEMY_ENGINE_OPTIONS'] = engine_options(app)
     db.init_app(app)
-    socketio.init_app(app, cors_allowed_origins="*", async_mode='threading')
+    socketio.init_app(app,
+                      cors_allowed_origins=app.config.get('SOCKETIO_CORS_ALLOWED_ORIGINS', '*'),
+                      async_mode=socketio_async_mode(app),
+                      **socketio_queue_options(app))
     migrate.init_app(app, db)
     
+    from app.services.tally import tally_engine
+    from app.services.broadcast import broadcast_scheduler
+    from app.services.vote_buffer import vote_buffer
+    from app.services.votes import idempotency_keys
+    from app.services.session_stats import stats_cache
+    from app.services.session_resolver import session_resolver
+    from app.services.deck_cache import deck_cache
+    from app.services.presence import presence
+    from app.services.join_buffer import join_buffer
+    from app.services.analytics import analytics_cache
+    from app.services.qr_cache import qr_cache
+    from app.services.images import image_pipeline
+    from app.services.media import media_store
+    from app.services.codes import code_allocator
+    from app.services.passwords import password_hasher
+    from app.services.user_cache import user_cache
+    tally_engine.init_app(app)
+    broadcast_scheduler.init_app(app)
+    vote_buffer.init_app(app)
+    idempotency_keys.init_app(app)
+    stats_cache.init_app(app)
+    session_resolver.init_app(app)
+    deck_cache.init_app(app)
+    presence.init_app(app)
+    join_buffer.init_app(app)
+    analytics_cache.init_app(app)
+    qr_cache.init_app(app)
+    image_pipeline.init_app(app)
+    media_store.init_app(app)
+    code_allocator.init_app(app)
+    password_hasher.init_app(app)
+    user_cache.init_app(app)
+    
     # Setup Flask-Login
     login_manager.init_app(app)
     login_manager.login_view = 'auth.login'
@@ -29,17 +116,23 @@ def create_app(config_class=Config):
     
     @login_manager.user_loader
     def load_user(user_id):
-        from app.models import User
-        return User.query.get(int(user_id))
+        # Cached per process; see UserCache for invalidation
+        return user_cache.get(int(user_id))
     
     # Register blueprints
     from app.routes.admin import admin_bp
     from app.routes.participant import participant_bp
     from app.routes.auth import auth_bp
+    from app.routes.media import media_bp
     
     app.register_blueprint(admin_bp, url_prefix='/admin')
     app.register_blueprint(participant_bp, url_prefix='/')
     app.register_blueprint(auth_bp, url_prefix='/auth')
+    app.register_blueprint(media_bp, url_prefix='/media')
+    
+    # CLI commands
+    from app.commands import repair_counters_command
+    app.cli.add_command(repair_counters_command)
     
     # Register SocketIO events
     from app.sockets import events
@@ -0,0 +1,14 @@
+# app/commands.py
+
+import click
+from flask.cli import with_appcontext
+
+
+@click.command('repair-counters')
+@with_appcontext
+def repair_counters_command():
+    """Recompute the denormalized vote, poll, participant and session counters"""
+    from app.services.counters import repair_counters
+
+    repair_counters()
+    click.echo('Counters repaired.')
@@ -1,14 +1,12 @@
 from datetime import datetime
 from app import db
-import secrets
-import string
 from flask_login import UserMixin
-import bcrypt
 
 
 def generate_session_code():
-    """Generate unique 6-character session code"""
-    return ''.join(secrets.choice(string.ascii_uppercase + string.digits) for _ in range(6))
+    """Generate unique 6-character session code (see app.services.codes)"""
+    from app.services.codes import code_allocator
+    return code_allocator.allocate()
 
 class User(UserMixin, db.Model):
     __tablename__ = 'users'
@@ -22,16 +20,24 @@ class User(UserMixin, db.Model):
     is_active = db.Column(db.Boolean, default=True)
     created_at = db.Column(db.DateTime, default=datetime.utcnow)
     last_login = db.Column(db.DateTime)
+    session_count = db.Column(db.Integer, nullable=False, default=0, server_default='0')
     
     # Relationship with sessions
     sessions = db.relationship('Session', backref='creator', lazy=True, cascade='all, delete-orphan')
     
     def set_password(self, password):
-        salt = bcrypt.gensalt(rounds=12) 
-        self.password_hash = bcrypt.hashpw(password.encode('utf-8'), bcrypt.gensalt()).decode('utf-8')
+        """Hash with BCRYPT_ROUNDS in the bounded hasher pool (may raise PasswordHasherBusy)"""
+        from app.services.passwords import password_hasher
+        self.password_hash = password_hasher.hash(password)
     
     def check_password(self, password):
-        return bcrypt.checkpw(password.encode('utf-8'), self.password_hash.encode('utf-8'))
+        from app.services.passwords import password_hasher
+        return password_hasher.verify(password, self.password_hash)
+    
+    def password_needs_rehash(self):
+        """True when the stored hash was made with a different cost than BCRYPT_ROUNDS"""
+        from app.services.passwords import password_hasher
+        return password_hasher.needs_rehash(self.password_hash)
     
     def to_dict(self):
         return {
@@ -43,7 +49,7 @@ class User(UserMixin, db.Model):
             'is_active': self.is_active,
             'created_at': self.created_at.isoformat() if self.created_at else None,
             'last_login': self.last_login.isoformat() if self.last_login else None,
-            'total_sessions': len(self.sessions)
+            'total_sessions': self.session_count
         }
 
 
@@ -60,32 +66,9 @@ class Session(db.Model):
     current_slide_index = db.Column(db.Integer, default=0)
     created_at = db.Column(db.DateTime, default=datetime.utcnow)
     
-    # Relationships
-    polls = db.relationship('Poll', backref='session', lazy=True, cascade='all, delete-orphan')
-    participants = db.relationship('Participant', backref='session', lazy=True, cascade='all, delete-orphan')
-    
-    def to_dict(self):
-        return {
-            'id': self.id,
-            'user_id': self.user_id,
-            'creator_name': self.creator.username if self.creator else None,  
-            'code': self.code,
-            'title': self.title,
-            'description': self.description,
-            'is_active': self.is_active,
-            'current_slide_index': self.current_slide_index,
-            'total_polls': len(self.polls),
-            'created_at': self.created_at.isoformat()
-        }
-    __tablename__ = 'sessions'
-    
-    id = db.Column(db.Integer, primary_key=True)
-    code = db.Column(db.String(6), unique=True, nullable=False, default=generate_session_code)
-    title = db.Column(db.String(200), nullable=False)
-    description = db.Column(db.Text)
-    is_active = db.Column(db.Boolean, default=True)
-    current_slide_index = db.Column(db.Integer, default=0)
-    created_at = db.Column(db.DateTime, default=datetime.utcnow)
+    # Denormalized counters (maintained on write, see `flask repair-counters`)
+    poll_count = db.Column(db.Integer, nullable=False, default=0, server_default='0')
+    online_count = db.Column(db.Integer, nullable=False, default=0, server_default='0')
     
     # Relationships
     polls = db.relationship('Poll', backref='session', lazy=True, cascade='all, delete-orphan')
@@ -94,12 +77,13 @@ class Session(db.Model):
     def to_dict(self):
         return {
             'id': self.id,
+            'user_id': self.user_id,
             'code': self.code,
             'title': self.title,
             'description': self.description,
             'is_active': self.is_active,
             'current_slide_index': self.current_slide_index,
-            'total_polls': len(self.polls),
+            'total_polls': self.poll_count,
             'created_at': self.created_at.isoformat()
         }
 
@@ -118,6 +102,8 @@ class Poll(db.Model):
     anonymous = db.Column(db.Boolean, default=True)
     show_results = db.Column(db.Boolean, default=True)
     image_url = db.Column(db.String(500), nullable=True)
+    image_renditions = db.Column(db.JSON, nullable=True)  # {'webp': [{'width', 'url'}], 'jpg': [...]}
+    vote_count = db.Column(db.Integer, nullable=False, default=0, server_default='0')
 
     # Relationships
     votes = db.relationship('Vote', backref='poll', lazy=True, cascade='all, delete-orphan')
@@ -130,35 +116,66 @@ class Poll(db.Model):
             'poll_type': self.poll_type,
             'options': self.options,
             'image_url': self.image_url,
+            'image_srcset': self.image_srcset(),
             'settings': {
                 'allow_multiple': self.allow_multiple,
                 'anonymous': self.anonymous,
                 'show_results': self.show_results
             },
-            'total_votes': len(self.votes)
+            'total_votes': self.total_votes()
         }
     
+    def image_srcset(self):
+        """srcset strings per rendition format, or None while processing"""
+        from app.services.images import image_srcset
+        
+        if not self.image_renditions:
+            return None
+        return {ext: image_srcset(self.image_renditions, ext) for ext in self.image_renditions}
+    
+    def total_votes(self):
+        """Committed vote count, maintained in the same transaction as the votes"""
+        return self.vote_count or 0
+    
     def get_results(self):
         """Calculate vote distribution"""
-        from collections import Counter
-        
-        if self.poll_type in ['multiple_choice', 'rating_scale']:
-            # Initialize with all options at 0
-            results = {option: 0 for option in self.options}
-            for vote in self.votes:
-                if vote.answer in results:
-                    results[vote.answer] += 1
-            return results
+        from app.services.tally import tally_engine
         
-        elif self.poll_type == 'word_cloud':
-            # Count word frequency for word cloud
-            all_words = [vote.answer.strip().lower() for vote in self.votes if vote.answer.strip()]
-            word_counts = Counter(all_words)
-            return dict(word_counts)  # Return {word: count}
+        if self.poll_type == 'open_ended':
+            # Answers are not kept in memory; read them in vote order
+            return [answer for (answer,) in db.session.query(Vote.answer).filter(
+                Vote.poll_id == self.id
+            ).order_by(Vote.id)]
         
-        else:  # open_ended
-            # Return list of all answers for open-ended questions
-            return [vote.answer for vote in self.votes]
+        # Served from in-memory counters; the votes table is only read
+        # the first time this poll is seen by the process
+        return tally_engine.results(self)
+
+class UploadBlob(db.Model):
+    """An uploaded file, stored once under its SHA-256 and shared by every poll using it"""
+    __tablename__ = 'upload_blobs'
+    
+    digest = db.Column(db.String(64), primary_key=True)
+    ext = db.Column(db.String(10), nullable=False)
+    size = db.Column(db.Integer, nullable=False)
+    ref_count = db.Column(db.Integer, nullable=False, default=0, server_default='0')
+    renditions = db.Column(db.JSON, nullable=True)  # same shape as Poll.image_renditions
+    created_at = db.Column(db.DateTime, default=datetime.utcnow)
+    
+    @property
+    def filename(self):
+        return f'{self.digest}.{self.ext}'
+    
+    @property
+    def url(self):
+        return f'/media/{self.filename}'
+
+class CodeCounter(db.Model):
+    """Next unreserved index of the session-code permutation"""
+    __tablename__ = 'code_counters'
+    
+    name = db.Column(db.String(32), primary_key=True)
+    next_index = db.Column(db.BigInteger, nullable=False, default=0)
 
 class Participant(db.Model):
     __tablename__ = 'participants'
@@ -178,7 +195,8 @@ class Vote(db.Model):
     id = db.Column(db.Integer, primary_key=True)
     poll_id = db.Column(db.Integer, db.ForeignKey('polls.id'), nullable=False)
     participant_id = db.Column(db.Integer, db.ForeignKey('participants.id'), nullable=False)
-    answer = db.Column(db.Text, nullable=False)
+    answer = db.Column(db.Text, nullable=True)  # Text answers (word_cloud, open_ended)
+    choice_mask = db.Column(db.BigInteger, nullable=True)  # Choice polls: bit i = option i
     voted_at = db.Column(db.DateTime, default=datetime.utcnow)
     
     # Unique constraint: one vote per participant per poll
@@ -1,35 +1,44 @@
 # app/routes/admin.py
 
-from flask import Blueprint, render_template, request, jsonify, redirect, url_for, flash
+from flask import Blueprint, render_template, request, jsonify, redirect, url_for, flash, abort, Response, stream_with_context
 from flask_login import login_required, current_user
 from app import db
-from app.models import Session, Poll, Vote, Participant
-import qrcode
-import io
+from sqlalchemy import func, insert
+from app.models import Session, Poll
 import base64
-from datetime import datetime
-import random
-import string
+from datetime import datetime, timedelta
 from app.models import User
-from werkzeug.utils import secure_filename
 import os
-import uuid
+import json
+from app.services.session_stats import session_counts, session_row, dashboard_overview, stats_cache
+from app.services.session_resolver import session_resolver, session_info_dict
+from app.services.deck_cache import deck_cache
+from app.services.qr_cache import qr_cache, QR_FORMATS
+from app.services.images import image_pipeline
+from app.services.media import media_store, is_media_url
+from app.services.codes import code_allocator
+from app.services.user_cache import user_cache
+from app.services.counters import bump_user_sessions
+from app.services.presence import presence
+from app.sockets.rooms import emit_session
+from app.services.choices import MAX_OPTIONS
 
 admin_bp = Blueprint('admin', __name__)
 
-# Configuration for file uploads
+# Configuration for file uploads (new uploads go to media_store; this
+# folder only holds images uploaded before content-addressed storage)
 UPLOAD_FOLDER = 'app/static/uploads/polls'
 ALLOWED_EXTENSIONS = {'png', 'jpg', 'jpeg', 'gif', 'webp'}
 MAX_FILE_SIZE = 5 * 1024 * 1024  # 5MB
 
+# open_ended answer feed paging
+ANSWER_PAGE_SIZE = 100
+MAX_ANSWER_PAGE_SIZE = 500
+
 def allowed_file(filename):
     """Check if file extension is allowed"""
     return '.' in filename and filename.rsplit('.', 1)[1].lower() in ALLOWED_EXTENSIONS
 
-def generate_code(length=6):
-    """Generate random session code"""
-    return ''.join(random.choices(string.ascii_uppercase + string.digits, k=length))
-
 # Ensure upload directory exists
 os.makedirs(UPLOAD_FOLDER, exist_ok=True)
 
@@ -52,7 +61,9 @@ def create_session_page():
 @login_required
 def dashboard(session_code):
     """Render live dashboard"""
-    poll_session = Session.query.filter_by(code=session_code).first_or_404()
+    poll_session = session_resolver.resolve(session_code)
+    if not poll_session:
+        abort(404)
     
     # Check ownership (user can only access their own sessions, unless admin)
     if poll_session.user_id != current_user.id and not current_user.is_admin:
@@ -97,6 +108,7 @@ def users_management():
                 new_user.set_password(password)
                 db.session.add(new_user)
                 db.session.commit()
+                user_cache.invalidate(new_user.id)
                 flash(f'✅ User {username} berhasil dibuat!', 'success')
         
         elif action == 'edit':
@@ -130,6 +142,8 @@ def users_management():
                     user.set_password(password)
                 
                 db.session.commit()
+                # Covers deactivation too: the next request reloads is_active
+                user_cache.invalidate(user.id)
                 flash(f'✅ User {username} berhasil diupdate!', 'success')
         
         elif action == 'delete':
@@ -139,8 +153,17 @@ def users_management():
             else:
                 user = User.query.get_or_404(user_id)
                 username = user.username
+                # The user's sessions go with it; release their images the
+                # same way deleting a single session does
+                sessions = [(sess.id, sess.code, [poll.id for poll in sess.polls]) for sess in user.sessions]
+                orphaned = release_session_images([session_id for session_id, _, _ in sessions])
                 db.session.delete(user)
                 db.session.commit()
+                media_store.discard(*orphaned)
+                for session in sessions:
+                    forget_session(*session)
+                stats_cache.invalidate(int(user_id))
+                user_cache.invalidate(int(user_id))
                 flash(f'✅ User {username} berhasil dihapus!', 'success')
         
         return redirect(url_for('admin.users_management'))
@@ -187,10 +210,16 @@ def create_session_api():
         if not data.get('title'):
             return jsonify({'success': False, 'error': 'Title is required'}), 400
         
-        # Generate unique code
-        code = generate_code()
-        while Session.query.filter_by(code=code).first():
-            code = generate_code()
+        # Choice votes are stored as a bitmask, one bit per option
+        for idx, slide_data in enumerate(slides_data):
+            if len(slide_data.get('options') or []) > MAX_OPTIONS:
+                return jsonify({
+                    'success': False,
+                    'error': f'Slide {idx + 1} has more than {MAX_OPTIONS} options'
+                }), 400
+        
+        # Unique by construction (keyed permutation, no lookup per code)
+        code = code_allocator.allocate()
         
         # Create session
         new_session = Session(
@@ -199,14 +228,19 @@ def create_session_api():
             description=data.get('description'),
             code=code,
             is_active=False,
-            current_slide_index=0
+            current_slide_index=0,
+            poll_count=len(slides_data)
         )
         db.session.add(new_session)
         db.session.flush()  # Get session ID before creating polls
+        bump_user_sessions(current_user.id)
         
-        # Create polls for each slide
+        # Collect poll rows for one bulk INSERT; new images are resized after the commit
+        poll_rows = []
+        uploads = {}
         for idx, slide_data in enumerate(slides_data):
             image_url = None
+            image_renditions = None
             
             # Handle image upload for this slide
             if not request.is_json:  # Only process files if FormData
@@ -227,32 +261,35 @@ def create_session_api():
                                 'error': f'Image for slide {idx + 1} exceeds 5MB limit'
                             }), 400
                         
-                        # Generate unique filename
+                        # Stored once per content (SHA-256); an image that is
+                        # already known only gains a reference
                         ext = file.filename.rsplit('.', 1)[1].lower()
-                        unique_filename = f"{code}_slide_{idx}_{uuid.uuid4().hex[:8]}.{ext}"
-                        
-                        # Save file
-                        filepath = os.path.join(UPLOAD_FOLDER, unique_filename)
-                        file.save(filepath)
-                        
-                        # Store relative URL for database
-                        image_url = f'/static/uploads/polls/{unique_filename}'
+                        blob = media_store.store(file, ext)
+                        image_url = blob.url
+                        image_renditions = blob.renditions
+                        if blob.renditions is None:
+                            uploads[blob.digest] = media_store.path(blob.filename)
             
             # Create poll
-            poll = Poll(
-                session_id=new_session.id,
-                slide_number=slide_data.get('slideNumber'),
-                question=slide_data.get('question'),
-                poll_type=slide_data.get('type'),
-                options=slide_data.get('options', []),
-                allow_multiple=slide_data.get('settings', {}).get('allowMultiple', False),
-                anonymous=slide_data.get('settings', {}).get('anonymous', True),
-                show_results=slide_data.get('settings', {}).get('showResults', True),
-                image_url=image_url  # Add image URL to poll
-            )
-            db.session.add(poll)
-        
+            poll_rows.append({
+                'session_id': new_session.id,
+                'slide_number': slide_data.get('slideNumber'),
+                'question': slide_data.get('question'),
+                'poll_type': slide_data.get('type'),
+                'options': slide_data.get('options', []),
+                'allow_multiple': slide_data.get('settings', {}).get('allowMultiple', False),
+                'anonymous': slide_data.get('settings', {}).get('anonymous', True),
+                'show_results': slide_data.get('settings', {}).get('showResults', True),
+                'image_url': image_url,  # Add image URL to poll
+                'image_renditions': image_renditions
+            })
+        
+        if poll_rows:
+            db.session.execute(insert(Poll), poll_rows)
         db.session.commit()
+        stats_cache.invalidate(current_user.id)
+        for digest, filepath in uploads.items():
+            image_pipeline.submit(digest, filepath)
         
         return jsonify({
             'success': True,
@@ -267,79 +304,296 @@ def create_session_api():
         traceback.print_exc()
         return jsonify({'success': False, 'error': str(e)}), 400
 
+SESSION_SORTS = {
+    'newest': (Session.created_at, True),
+    'oldest': (Session.created_at, False),
+    'title': (Session.title, False),
+    'participants': (Session.online_count, True),
+}
+
+def encode_cursor(value, row_id):
+    """Opaque keyset cursor for (sort value, id)"""
+    if isinstance(value, datetime):
+        value = value.isoformat()
+    raw = json.dumps([value, row_id]).encode()
+    return base64.urlsafe_b64encode(raw).decode()
+
+def decode_cursor(cursor, column):
+    value, row_id = json.loads(base64.urlsafe_b64decode(cursor.encode()))
+    if column is Session.created_at:
+        value = datetime.fromisoformat(value)
+    return value, row_id
+
 @admin_bp.route('/api/sessions/all')
 @login_required  
 def get_all_sessions():
-    """Get all sessions with statistics - filtered by user"""
+    """Get a page of sessions with statistics - filtered by user.
+
+    Query params: limit, cursor (from next_cursor), q (title/code search),
+    status (all/active/inactive), sort (newest/oldest/title/participants).
+    """
+    limit = min(max(request.args.get('limit', 50, type=int), 1), 200)
+    cursor = request.args.get('cursor')
+    search = request.args.get('q', '').strip()
+    status = request.args.get('status', 'all')
+    column, descending = SESSION_SORTS.get(request.args.get('sort'), SESSION_SORTS['newest'])
+    
     # Admin bisa lihat semua, user biasa hanya miliknya
-    if current_user.is_admin:
-        sessions = Session.query.order_by(Session.created_at.desc()).all()
+    query = Session.query
+    if not current_user.is_admin:
+        query = query.filter(Session.user_id == current_user.id)
+    
+    if search:
+        pattern = f'%{search}%'
+        query = query.filter(db.or_(Session.title.ilike(pattern), Session.code.ilike(pattern)))
+    if status == 'active':
+        query = query.filter(Session.is_active == True)
+    elif status == 'inactive':
+        query = query.filter(Session.is_active == False)
+    
+    # Keyset pagination on (sort column, id)
+    if cursor:
+        try:
+            value, last_id = decode_cursor(cursor, column)
+        except (ValueError, TypeError):
+            return jsonify({'error': 'Invalid cursor'}), 400
+        if descending:
+            query = query.filter(db.or_(column < value, db.and_(column == value, Session.id < last_id)))
+        else:
+            query = query.filter(db.or_(column > value, db.and_(column == value, Session.id > last_id)))
+    
+    if descending:
+        query = query.order_by(column.desc(), Session.id.desc())
     else:
-        sessions = Session.query.filter_by(user_id=current_user.id).order_by(Session.created_at.desc()).all()
-    
-    sessions_data = []
-    total_participants = 0
-    total_votes = 0
-    active_count = 0
-    
-    for sess in sessions:
-        participant_count = Participant.query.filter_by(
-            session_id=sess.id, 
-            is_online=True
-        ).count()
-        vote_count = Vote.query.join(Poll).filter(
-            Poll.session_id == sess.id
-        ).count()
-        
-        total_participants += participant_count
-        total_votes += vote_count
-        if sess.is_active:
-            active_count += 1
-        
-        session_dict = sess.to_dict()
-        session_dict['participant_count'] = participant_count
-        session_dict['vote_count'] = vote_count
-        session_dict['poll_count'] = len(sess.polls)
-        sessions_data.append(session_dict)
+        query = query.order_by(column.asc(), Session.id.asc())
     
-    return jsonify({
+    sessions = query.limit(limit + 1).all()
+    has_more = len(sessions) > limit
+    sessions = sessions[:limit]
+    
+    counts = session_counts([sess.id for sess in sessions])
+    sessions_data = [session_row(sess, counts[sess.id]) for sess in sessions]
+    
+    next_cursor = None
+    if has_more:
+        last = sessions[-1]
+        next_cursor = encode_cursor(getattr(last, column.key), last.id)
+    
+    response = {
         'sessions': sessions_data,
-        'stats': {
-            'total': len(sessions),
-            'active': active_count,
-            'participants': total_participants,
-            'votes': total_votes
-        }
-    })
+        'next_cursor': next_cursor
+    }
+    
+    # Totals only on the first page
+    if not cursor:
+        owner_id = None if current_user.is_admin else current_user.id
+        response['stats'] = stats_cache.get(owner_id, dashboard_overview)['stats']
+    
+    return jsonify(response)
 
 @admin_bp.route('/api/sessions/<session_code>')
 @login_required  
 def get_session(session_code):
     """Get session details with all polls and status"""
-    poll_session = Session.query.filter_by(code=session_code).first_or_404()
+    poll_session = session_resolver.resolve(session_code)
+    if not poll_session:
+        abort(404)
     
     # Check ownership
     if poll_session.user_id != current_user.id and not current_user.is_admin:
         return jsonify({'error': 'Unauthorized'}), 403
     
+    from app.services.votes import answer_page
+    
     polls_data = []
-    for poll in sorted(poll_session.polls, key=lambda x: x.slide_number):
+    for poll in Poll.query.filter_by(session_id=poll_session.id).order_by(Poll.slide_number):
         poll_dict = poll.to_dict()
-        results = poll.get_results()
-        poll_dict['results'] = results if results else {}
+        if poll.poll_type == 'open_ended':
+            # First page only; the dashboard pages on by Vote.id
+            answers, cursor, has_more = answer_page(poll.id, 0, ANSWER_PAGE_SIZE)
+            poll_dict['results'] = answers
+            poll_dict['cursor'] = cursor
+            poll_dict['has_more'] = has_more
+        else:
+            results = poll.get_results()
+            poll_dict['results'] = results if results else {}
         polls_data.append(poll_dict)
     
-    session_data = poll_session.to_dict()
+    session_data = session_info_dict(poll_session)
     session_data['polls'] = polls_data
-    session_data['participant_count'] = Participant.query.filter_by(
-        session_id=poll_session.id, 
-        is_online=True
-    ).count()
+    session_data['participant_count'] = presence.count(poll_session.id)
     session_data['is_active'] = poll_session.is_active
     session_data['current_slide'] = poll_session.current_slide_index
     
     return jsonify(session_data)
 
+@admin_bp.route('/api/polls/<int:poll_id>/answers')
+@login_required
+def get_poll_answers(poll_id):
+    """Page through an open_ended poll's answers (?after=<Vote.id>&limit=)"""
+    from app.services.tally import tally_engine
+    from app.services.votes import answer_page
+    
+    tally = tally_engine.lookup(poll_id)
+    if tally is None:
+        abort(404)
+    
+    # Check ownership
+    if tally.owner_id != current_user.id and not current_user.is_admin:
+        return jsonify({'error': 'Unauthorized'}), 403
+    if tally.poll_type != 'open_ended':
+        return jsonify({'error': 'Not an open-ended poll'}), 400
+    
+    after = request.args.get('after', 0, type=int)
+    limit = min(max(request.args.get('limit', ANSWER_PAGE_SIZE, type=int), 1), MAX_ANSWER_PAGE_SIZE)
+    answers, cursor, has_more = answer_page(poll_id, after, limit)
+    
+    return jsonify({
+        'poll_id': poll_id,
+        'answers': answers,
+        'cursor': cursor,
+        'total': tally.total,
+        'has_more': has_more
+    })
+
+# ========== API: ANALYTICS ==========
+
+@admin_bp.route('/api/sessions/<session_code>/analytics')
+@login_required
+def session_analytics(session_code):
+    """Funnel and response-time report across a session's polls"""
+    from app.services.analytics import analytics_cache
+    
+    poll_session = session_resolver.resolve(session_code)
+    if not poll_session:
+        abort(404)
+    
+    # Check ownership
+    if poll_session.user_id != current_user.id and not current_user.is_admin:
+        return jsonify({'error': 'Unauthorized'}), 403
+    
+    return jsonify(analytics_cache.matrix(poll_session).report())
+
+@admin_bp.route('/api/sessions/<session_code>/analytics/crosstab')
+@login_required
+def session_crosstab(session_code):
+    """How those who picked each option of poll ?a= answered poll ?b="""
+    from app.services.analytics import analytics_cache
+    from app.services.choices import CHOICE_TYPES
+    
+    poll_session = session_resolver.resolve(session_code)
+    if not poll_session:
+        abort(404)
+    
+    # Check ownership
+    if poll_session.user_id != current_user.id and not current_user.is_admin:
+        return jsonify({'error': 'Unauthorized'}), 403
+    
+    matrix = analytics_cache.matrix(poll_session)
+    poll_a = request.args.get('a', type=int)
+    poll_b = request.args.get('b', type=int)
+    for poll_id in (poll_a, poll_b):
+        if poll_id not in matrix.poll_index:
+            return jsonify({'error': 'Poll not found in this session'}), 404
+        if matrix.polls[matrix.poll_index[poll_id]].poll_type not in CHOICE_TYPES:
+            return jsonify({'error': 'Cross-tabs need two choice polls'}), 400
+    
+    return jsonify(matrix.crosstab(poll_a, poll_b))
+
+# ========== API: EXPORT ==========
+
+def export_response(session_ids, filename):
+    """Stream votes of the given sessions in the requested ?format="""
+    from app.services.export import EXPORT_FORMATS, STREAMERS, export_rows, parquet_available
+    from app.services.vote_buffer import vote_buffer
+    
+    fmt = request.args.get('format', 'csv').lower()
+    if fmt not in EXPORT_FORMATS:
+        return jsonify({'error': f'Unknown format, use one of: {", ".join(EXPORT_FORMATS)}'}), 400
+    if fmt == 'parquet' and not parquet_available():
+        return jsonify({'error': 'Parquet export needs the pyarrow package'}), 400
+    
+    # Include votes still waiting in the write-behind buffer
+    if vote_buffer.enabled:
+        vote_buffer.flush()
+    
+    stream = STREAMERS[fmt](export_rows(session_ids))
+    return Response(stream_with_context(stream), mimetype=EXPORT_FORMATS[fmt], headers={
+        'Content-Disposition': f'attachment; filename={filename}.{fmt}',
+        'X-Accel-Buffering': 'no'
+    })
+
+@admin_bp.route('/api/sessions/<session_code>/export')
+@login_required
+def export_session(session_code):
+    """Download one session's votes (?format=csv|jsonl|parquet)"""
+    poll_session = session_resolver.resolve(session_code)
+    if not poll_session:
+        abort(404)
+    
+    # Check ownership
+    if poll_session.user_id != current_user.id and not current_user.is_admin:
+        return jsonify({'error': 'Unauthorized'}), 403
+    
+    return export_response([poll_session.id], f'brtanya-{session_code}')
+
+@admin_bp.route('/api/export')
+@login_required
+def export_sessions():
+    """Download votes of every session created in a date range.
+    
+    Query params: from, to (YYYY-MM-DD, inclusive), format. Admins export
+    all sessions, other users only their own.
+    """
+    try:
+        start = datetime.strptime(request.args['from'], '%Y-%m-%d') if request.args.get('from') else None
+        end = datetime.strptime(request.args['to'], '%Y-%m-%d') if request.args.get('to') else None
+    except ValueError:
+        return jsonify({'error': 'Dates must be YYYY-MM-DD'}), 400
+    
+    query = db.session.query(Session.id)
+    if not current_user.is_admin:
+        query = query.filter(Session.user_id == current_user.id)
+    if start:
+        query = query.filter(Session.created_at >= start)
+    if end:
+        query = query.filter(Session.created_at < end + timedelta(days=1))
+    session_ids = [row.id for row in query.order_by(Session.created_at)]
+    
+    label = '_'.join(filter(None, [request.args.get('from'), request.args.get('to')])) or 'all'
+    return export_response(session_ids, f'brtanya-sessions-{label}')
+
+def release_session_images(session_ids):
+    """Drop the image references of these sessions' polls, inside the transaction.
+
+    One grouped query instead of a walk over the polls. Shared media lose a
+    reference per poll; returns the files to discard() after the commit
+    (media only when no other poll uses them).
+    """
+    image_urls = dict(db.session.query(Poll.image_url, func.count(Poll.id)).filter(
+        Poll.session_id.in_(session_ids), Poll.image_url.isnot(None)
+    ).group_by(Poll.image_url).all())
+    orphaned = media_store.release({url: n for url, n in image_urls.items() if is_media_url(url)})
+    orphaned += [
+        os.path.join(UPLOAD_FOLDER, url.split('/')[-1])
+        for url in image_urls if not is_media_url(url)
+    ]
+    return orphaned
+
+def forget_session(session_id, code, poll_ids):
+    """Drop a deleted session from the process-local caches"""
+    from app.services.tally import tally_engine
+    from app.services.broadcast import broadcast_scheduler
+    from app.services.analytics import analytics_cache
+    
+    session_resolver.invalidate(code)
+    deck_cache.invalidate(session_id)
+    qr_cache.invalidate(code)
+    tally_engine.forget(*poll_ids)
+    broadcast_scheduler.forget(*poll_ids)
+    presence.forget(session_id)
+    analytics_cache.invalidate(session_id)
+
 @admin_bp.route('/api/sessions/<int:session_id>', methods=['DELETE'])
 @login_required  
 def delete_session(session_id):
@@ -351,20 +605,14 @@ def delete_session(session_id):
         return jsonify({'error': 'Unauthorized'}), 403
     
     try:
-        # Delete associated images
-        for poll in sess.polls:
-            if poll.image_url:
-                try:
-                    # Extract filename from URL
-                    filename = poll.image_url.split('/')[-1]
-                    filepath = os.path.join(UPLOAD_FOLDER, filename)
-                    if os.path.exists(filepath):
-                        os.remove(filepath)
-                except Exception as e:
-                    print(f"Error deleting image: {e}")
-        
+        orphaned = release_session_images([session_id])
+        poll_ids = [poll.id for poll in sess.polls]
         db.session.delete(sess)
+        bump_user_sessions(sess.user_id, -1)
         db.session.commit()
+        media_store.discard(*orphaned)
+        stats_cache.invalidate(sess.user_id)
+        forget_session(sess.id, sess.code, poll_ids)
         return jsonify({'success': True, 'message': 'Session deleted'}), 200
     except Exception as e:
         db.session.rollback()
@@ -377,32 +625,31 @@ def delete_session(session_id):
 def toggle_session(session_code):
     """Toggle session active status (Start/Pause)"""
     try:
-        poll_session = Session.query.filter_by(code=session_code).first_or_404()
+        poll_session = session_resolver.resolve(session_code)
+        if not poll_session:
+            return jsonify({'success': False, 'error': 'Session not found'}), 404
         
         # Check ownership
         if poll_session.user_id != current_user.id and not current_user.is_admin:
             return jsonify({'error': 'Unauthorized'}), 403
         
-        # Toggle status
-        poll_session.is_active = not poll_session.is_active
-        
-        # Update timestamp
-        if poll_session.is_active:
-            poll_session.started_at = datetime.utcnow()
-        
+        # Toggle status (single UPDATE by primary key)
+        is_active = not poll_session.is_active
+        Session.query.filter_by(id=poll_session.id).update({'is_active': is_active})
         db.session.commit()
+        session_resolver.update(session_code, is_active=is_active)
+        stats_cache.invalidate(poll_session.user_id)
         
         # Emit socket event
-        from app import socketio
-        socketio.emit('session_status_changed', {
-            'is_active': poll_session.is_active,
-            'message': 'Session started' if poll_session.is_active else 'Session paused'
-        }, room=session_code)
+        emit_session('session_status_changed', {
+            'is_active': is_active,
+            'message': 'Session started' if is_active else 'Session paused'
+        }, session_code)
         
         return jsonify({
             'success': True,
-            'is_active': poll_session.is_active,
-            'message': 'Session started' if poll_session.is_active else 'Session paused'
+            'is_active': is_active,
+            'message': 'Session started' if is_active else 'Session paused'
         })
     
     except Exception as e:
@@ -414,23 +661,26 @@ def toggle_session(session_code):
 def end_session(session_code):
     """End session - set is_active to False"""
     try:
-        poll_session = Session.query.filter_by(code=session_code).first_or_404()
+        poll_session = session_resolver.resolve(session_code)
+        if not poll_session:
+            return jsonify({'success': False, 'error': 'Session not found'}), 404
         
         # Check ownership
         if poll_session.user_id != current_user.id and not current_user.is_admin:
             return jsonify({'error': 'Unauthorized'}), 403
         
         # Set session as inactive
-        poll_session.is_active = False
-        poll_session.ended_at = datetime.utcnow()
-        
+        Session.query.filter_by(id=poll_session.id).update({'is_active': False})
         db.session.commit()
+        session_resolver.update(session_code, is_active=False)
+        stats_cache.invalidate(poll_session.user_id)
+        # Nobody is handed slides of an ended session any more
+        deck_cache.invalidate(poll_session.id)
         
         # Emit socket event to all participants
-        from app import socketio
-        socketio.emit('session_ended', {
+        emit_session('session_ended', {
             'message': 'Session has ended. Thank you for participating!'
-        }, room=session_code)
+        }, session_code)
         
         return jsonify({
             'success': True,
@@ -446,7 +696,9 @@ def end_session(session_code):
 def change_slide(session_code):
     """Change current slide and notify participants"""
     try:
-        poll_session = Session.query.filter_by(code=session_code).first_or_404()
+        poll_session = session_resolver.resolve(session_code)
+        if not poll_session:
+            return jsonify({'success': False, 'error': 'Session not found'}), 404
         
         # Check ownership
         if poll_session.user_id != current_user.id and not current_user.is_admin:
@@ -454,27 +706,23 @@ def change_slide(session_code):
         
         data = request.json
         new_slide_index = data.get('slide_index', 0)
-        poll_session.current_slide_index = new_slide_index
+        Session.query.filter_by(id=poll_session.id).update({'current_slide_index': new_slide_index})
         db.session.commit()
+        session_resolver.update(session_code, current_slide_index=new_slide_index)
         
-        # Get current poll
-        current_poll = None
-        if poll_session.polls:
-            sorted_polls = sorted(poll_session.polls, key=lambda x: x.slide_number)
-            if new_slide_index < len(sorted_polls):
-                current_poll = sorted_polls[new_slide_index]
+        # Get current poll from the compiled deck
+        current_poll = deck_cache.slide(poll_session.id, new_slide_index)
         
         # Emit socket event to participants
-        from app import socketio
-        socketio.emit('slide_changed', {
+        emit_session('slide_changed', {
             'slide_index': new_slide_index,
-            'poll': current_poll.to_dict() if current_poll else None
-        }, room=session_code)
+            'poll': current_poll
+        }, session_code)
         
         return jsonify({
             'success': True,
             'slide_index': new_slide_index,
-            'poll': current_poll.to_dict() if current_poll else None
+            'poll': current_poll
         })
     
     except Exception as e:
@@ -486,31 +734,37 @@ def change_slide(session_code):
 @admin_bp.route('/api/qrcode/<session_code>')
 @login_required  
 def generate_qr(session_code):
-    """Generate QR code for session join URL"""
+    """QR code for the session join URL.
+    
+    ?format=png|svg returns the image itself (cached, with ETag); without
+    it the response is the original JSON with a base64 PNG data URL.
+    ?size= sets the module size in pixels (2-20, default 10).
+    """
     try:
         # Verify session exists & check ownership
-        sess = Session.query.filter_by(code=session_code).first_or_404()
+        sess = session_resolver.resolve(session_code)
+        if not sess:
+            return jsonify({'success': False, 'error': 'Session not found'}), 404
         
         if sess.user_id != current_user.id and not current_user.is_admin:
             return jsonify({'error': 'Unauthorized'}), 403
         
         join_url = request.host_url + f'join?code={session_code}'
-        
-        qr = qrcode.QRCode(
-            version=1,
-            error_correction=qrcode.constants.ERROR_CORRECT_H,
-            box_size=10,
-            border=4
-        )
-        qr.add_data(join_url)
-        qr.make(fit=True)
-        
-        img = qr.make_image(fill_color="#7c3aed", back_color="white")
-        
-        # Convert to base64
-        buffered = io.BytesIO()
-        img.save(buffered, format="PNG")
-        img_str = base64.b64encode(buffered.getvalue()).decode()
+        box_size = min(max(request.args.get('size', 10, type=int), 2), 20)
+        fmt = request.args.get('format')
+        
+        if fmt:
+            if fmt not in QR_FORMATS:
+                return jsonify({'success': False, 'error': 'format must be png or svg'}), 400
+            etag, data = qr_cache.get(session_code, join_url, box_size, fmt)
+            response = Response(data, mimetype=QR_FORMATS[fmt])
+            response.set_etag(etag)
+            response.cache_control.private = True
+            response.cache_control.max_age = 3600
+            return response.make_conditional(request)
+        
+        etag, data = qr_cache.get(session_code, join_url, box_size, 'png')
+        img_str = base64.b64encode(data).decode()
         
         return jsonify({
             'success': True,
@@ -527,46 +781,7 @@ def generate_qr(session_code):
 @login_required  
 def dashboard_stats():
     """Get dashboard statistics for overview - filtered by user"""
-    # Filter by user
-    if current_user.is_admin:
-        sessions_query = Session.query
-    else:
-        sessions_query = Session.query.filter_by(user_id=current_user.id)
-    
-    total_sessions = sessions_query.count()
-    active_sessions = sessions_query.filter_by(is_active=True).count()
-    
-    # Get participant & vote counts from user's sessions only
-    user_session_ids = [s.id for s in sessions_query.all()]
-    total_participants = Participant.query.filter(
-        Participant.session_id.in_(user_session_ids),
-        Participant.is_online == True
-    ).count() if user_session_ids else 0
-    
-    total_votes = db.session.query(Vote).join(Poll).filter(
-        Poll.session_id.in_(user_session_ids)
-    ).count() if user_session_ids else 0
-    
-    # Recent sessions
-    recent_sessions = sessions_query.order_by(
-        Session.created_at.desc()
-    ).limit(5).all()
-    
-    recent_data = []
-    for sess in recent_sessions:
-        session_dict = sess.to_dict()
-        session_dict['total_polls'] = len(sess.polls)
-        session_dict['participant_count'] = Participant.query.filter_by(
-            session_id=sess.id
-        ).count()
-        recent_data.append(session_dict)
-    
-    return jsonify({
-        'stats': {
-            'total': total_sessions,
-            'active': active_sessions,
-            'participants': total_participants,
-            'votes': total_votes
-        },
-        'recent_sessions': recent_data
-    })
+    # Filter by user (None = all sessions for admins); served from the
+    # per-owner cache, recomputed only after a TTL or an invalidation
+    owner_id = None if current_user.is_admin else current_user.id
+    return jsonify(stats_cache.get(owner_id, dashboard_overview))
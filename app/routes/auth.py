@@ -4,6 +4,8 @@ from flask import Blueprint, render_template, request, jsonify, redirect, url_fo
 from flask_login import login_user, logout_user, login_required, current_user
 from app import db
 from app.models import User
+from app.services.passwords import PasswordHasherBusy, password_hasher
+from app.services.user_cache import user_cache
 from datetime import datetime
 
 auth_bp = Blueprint('auth', __name__)
@@ -40,8 +42,18 @@ def login():
         else:
             print(f"❌ User not found: {username}")
         
-        # Check user exists and password is correct
-        if user and user.check_password(password):
+        # Check user exists and password is correct (bcrypt runs in the
+        # bounded hasher pool; when it is full, ask the client to retry)
+        try:
+            verified = bool(user) and user.check_password(password)
+        except PasswordHasherBusy:
+            print(f"⏳ Password hasher busy, login deferred: {username}")
+            if request.is_json:
+                return password_hasher.busy_response(None)
+            flash('Server sedang sibuk, silakan coba lagi sebentar.', 'error')
+            return render_template('auth/login.html'), 503, {'Retry-After': str(password_hasher.retry_after)}
+        
+        if verified:
             print(f"✅ Password verified for: {username}")
             
             # Check if user is active
@@ -56,7 +68,14 @@ def login():
             try:
                 login_user(user, remember=remember)
                 user.last_login = datetime.utcnow()
+                if user.password_needs_rehash():
+                    # BCRYPT_ROUNDS changed since this hash was made
+                    try:
+                        user.set_password(password)
+                    except PasswordHasherBusy:
+                        pass  # upgrade on a later login
                 db.session.commit()
+                user_cache.invalidate(user.id)
                 
                 print(f"✅ Login successful: {username}")
                 
@@ -0,0 +1,12 @@
+# app/routes/media.py
+
+from flask import Blueprint
+from app.services.media import media_store
+
+media_bp = Blueprint('media', __name__)
+
+
+@media_bp.route('/<name>')
+def media_file(name):
+    """Content-addressed upload (original or rendition), cacheable forever"""
+    return media_store.send(name)
@@ -1,6 +1,7 @@
-from flask import Blueprint, render_template, request, jsonify
-from app import db
-from app.models import Session, Poll, Vote, Participant
+from flask import Blueprint, render_template, request, jsonify, current_app
+from app.services.session_resolver import session_resolver, session_info_dict
+from app.services.choices import CHOICE_TYPES, encode_choice
+from datetime import datetime
 
 participant_bp = Blueprint('participant', __name__)
 
@@ -17,51 +18,101 @@ def join_session():
     data = request.json
     session_code = data.get('session_code')
     
-    poll_session = Session.query.filter_by(code=session_code, is_active=True).first()
+    poll_session = session_resolver.resolve(session_code)
     
-    if not poll_session:
+    if not poll_session or not poll_session.is_active:
         return jsonify({'error': 'Invalid or inactive session'}), 404
     
     return jsonify({
         'success': True,
-        'session': poll_session.to_dict()
+        'session': session_info_dict(poll_session)
     })
 
 @participant_bp.route('/api/vote', methods=['POST'])
 def submit_vote():
     """Submit a vote"""
+    from app.services.tally import tally_engine
+    from app.services.vote_buffer import vote_buffer
+    from app.services.votes import (insert_votes, has_voted, publish_vote, idempotency_keys,
+                                    participant_in_session, clean_text_answer)
+    
     data = request.json
     
     poll_id = data.get('poll_id')
     participant_id = data.get('participant_id')
     answer = data.get('answer')
     
-    # Check if already voted
-    existing_vote = Vote.query.filter_by(
-        poll_id=poll_id,
-        participant_id=participant_id
-    ).first()
+    # Bad ids must be refused here: in write-behind mode they would only
+    # fail in the bulk INSERT, after the vote was acknowledged
+    if not is_id(poll_id) or not is_id(participant_id):
+        return jsonify({'error': 'poll_id and participant_id are required'}), 400
     
-    if existing_vote:
-        return jsonify({'error': 'Already voted'}), 400
+    # Poll type and room come from the tally (DB only on first sight),
+    # which also has to be seeded before the vote is written
+    tally = tally_engine.lookup(poll_id)
+    if not tally:
+        return jsonify({'error': 'Poll not found'}), 404
+    if not participant_in_session(participant_id, tally.session_id):
+        return jsonify({'error': 'Participant not found'}), 404
+    
+    # Choice polls store the selected option indices as a bitmask; the
+    # option text(s) in `answer` are still accepted from older clients
+    choice_mask = None
+    if tally.poll_type in CHOICE_TYPES:
+        try:
+            choice_mask = encode_choice(tally.options, answer, data.get('option_indices'),
+                                        allow_multiple=tally.allow_multiple)
+        except ValueError as e:
+            return jsonify({'error': str(e)}), 400
+        answer = None
+    else:
+        # Text polls need a real answer; only choice votes store NULL
+        try:
+            answer = clean_text_answer(answer, current_app.config['VOTE_ANSWER_MAX_LENGTH'])
+        except ValueError as e:
+            return jsonify({'error': str(e)}), 400
+    
+    # A retry of the vote this participant already sent with the same key
+    # is a no-op; any other repeat is rejected below
+    idempotency_key = request.headers.get('Idempotency-Key') or data.get('idempotency_key')
+    if idempotency_key and idempotency_keys.accepted(poll_id, participant_id, idempotency_key):
+        return jsonify({'success': True, 'duplicate': True})
     
-    # Create vote
-    vote = Vote(
-        poll_id=poll_id,
-        participant_id=participant_id,
-        answer=answer
-    )
-    db.session.add(vote)
-    db.session.commit()
+    if vote_buffer.enabled:
+        # Write-behind: queue for the next bulk INSERT, which also counts
+        # and broadcasts whatever it committed. Repeats of a committed vote
+        # are rejected here, repeats of a queued one by submit()
+        batch = None
+        if not has_voted(poll_id, participant_id):
+            batch = vote_buffer.submit(poll_id, participant_id, answer, choice_mask)
+        inserted = batch is not None
+        if inserted and vote_buffer.strict and not vote_buffer.wait(batch, poll_id, participant_id):
+            return jsonify({'error': 'Vote could not be saved, please retry'}), 503
+    else:
+        # Single conditional INSERT; _poll_participant_uc rejects repeats
+        inserted = bool(insert_votes([{
+            'poll_id': poll_id,
+            'participant_id': participant_id,
+            'answer': answer,
+            'choice_mask': choice_mask,
+            'voted_at': datetime.utcnow()
+        }]))
     
-    # Emit socket event for real-time update
-    from app import socketio
-    poll = Poll.query.get(poll_id)
+    if not inserted:
+        # A concurrent retry with the same key may have won the race
+        if idempotency_key and idempotency_keys.accepted(poll_id, participant_id, idempotency_key):
+            return jsonify({'success': True, 'duplicate': True})
+        return jsonify({'error': 'Already voted'}), 400
+    
+    if idempotency_key:
+        idempotency_keys.remember(poll_id, participant_id, idempotency_key)
     
-    socketio.emit('new_vote', {
-        'poll_id': poll_id,
-        'answer': answer,
-        'results': poll.get_results()
-    }, room=poll.session.code)
+    if not vote_buffer.enabled:
+        publish_vote(tally, choice_mask if choice_mask is not None else answer)
     
     return jsonify({'success': True})
+
+
+def is_id(value):
+    """Whether a JSON value can be a primary key"""
+    return isinstance(value, int) and not isinstance(value, bool) and value > 0
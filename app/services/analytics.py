@@ -0,0 +1,202 @@
+# app/services/analytics.py
+
+import threading
+from collections import OrderedDict
+import numpy as np
+from sqlalchemy import func
+from app import db
+from app.services.choices import CHOICE_TYPES, MAX_OPTIONS
+
+PERCENTILES = (10, 25, 50, 75, 90)
+
+
+class SessionMatrix:
+    """A session's votes as participant-by-poll numpy arrays.
+
+    Built from one query. `masks[p, q]` is participant p's choice bitmask
+    on poll q (0 = no choice vote), `voted[p, q]` whether they answered at
+    all, and `times[p, q]` the vote time in epoch seconds (NaN if none).
+    Every report below is computed from these arrays.
+    """
+
+    def __init__(self, session_id):
+        from app.models import Poll, Vote
+
+        polls = db.session.query(
+            Poll.id, Poll.slide_number, Poll.question, Poll.poll_type, Poll.options
+        ).filter(Poll.session_id == session_id).order_by(Poll.slide_number).all()
+        self.polls = polls
+        self._report = None
+        self.poll_index = {poll.id: q for q, poll in enumerate(polls)}
+
+        rows = db.session.query(
+            Vote.poll_id, Vote.participant_id, Vote.choice_mask, Vote.answer, Vote.voted_at
+        ).filter(Vote.poll_id.in_(list(self.poll_index))).all()
+
+        participant_ids = sorted({row.participant_id for row in rows})
+        self.participant_index = {pid: p for p, pid in enumerate(participant_ids)}
+
+        shape = (len(participant_ids), len(polls))
+        self.masks = np.zeros(shape, dtype=np.int64)
+        self.voted = np.zeros(shape, dtype=bool)
+        self.times = np.full(shape, np.nan)
+
+        if rows:
+            p = np.fromiter((self.participant_index[row.participant_id] for row in rows), dtype=np.intp, count=len(rows))
+            q = np.fromiter((self.poll_index[row.poll_id] for row in rows), dtype=np.intp, count=len(rows))
+            self.masks[p, q] = [self._mask(row) for row in rows]
+            self.voted[p, q] = True
+            self.times[p, q] = [row.voted_at.timestamp() if row.voted_at else np.nan for row in rows]
+
+    def _mask(self, row):
+        if row.choice_mask is not None:
+            return row.choice_mask
+        # Votes from before choice_mask existed carry the option text
+        poll = self.polls[self.poll_index[row.poll_id]]
+        if poll.poll_type in CHOICE_TYPES and row.answer in (poll.options or []):
+            return 1 << poll.options.index(row.answer)
+        return 0
+
+    @property
+    def participants(self):
+        return len(self.participant_index)
+
+    def bits(self, poll_id):
+        """Participant-by-option 0/1 matrix for a choice poll"""
+        q = self.poll_index[poll_id]
+        n_options = min(len(self.polls[q].options or []), MAX_OPTIONS)
+        return (self.masks[:, q, None] >> np.arange(n_options, dtype=np.int64)) & 1
+
+    def crosstab(self, poll_a, poll_b):
+        """How participants who chose each option of poll_a answered poll_b"""
+        a, b = self.polls[self.poll_index[poll_a]], self.polls[self.poll_index[poll_b]]
+        counts = self.bits(poll_a).T @ self.bits(poll_b)
+        return {
+            'rows': {'poll_id': a.id, 'question': a.question, 'options': a.options},
+            'columns': {'poll_id': b.id, 'question': b.question, 'options': b.options},
+            'counts': counts.tolist()
+        }
+
+    def funnel(self):
+        """Per slide: who answered, who answered every slide so far, who changed answer.
+
+        `changed` compares a choice poll with the previous slide when both
+        offer the same options (e.g. a question asked again after a
+        discussion), counting participants who answered both differently.
+        """
+        steps = []
+        still_in = np.ones(self.participants, dtype=bool)
+        for q, poll in enumerate(self.polls):
+            answered = self.voted[:, q]
+            still_in &= answered
+            step = {
+                'poll_id': poll.id,
+                'slide_number': poll.slide_number,
+                'answered': int(answered.sum()),
+                'answered_all_so_far': int(still_in.sum()),
+            }
+
+            prev = self.polls[q - 1] if q else None
+            if (prev is not None and poll.poll_type in CHOICE_TYPES
+                    and prev.poll_type in CHOICE_TYPES and prev.options == poll.options):
+                both = (self.masks[:, q - 1] != 0) & (self.masks[:, q] != 0)
+                step['answered_both'] = int(both.sum())
+                step['changed'] = int((both & (self.masks[:, q - 1] != self.masks[:, q])).sum())
+            steps.append(step)
+        return steps
+
+    def response_times(self, bins=10):
+        """Distribution of seconds between a poll's first vote and each vote.
+
+        Slide start times are not stored, so the first vote on a poll is
+        the reference point.
+        """
+        report = {}
+        for q, poll in enumerate(self.polls):
+            times = self.times[:, q]
+            times = times[~np.isnan(times)]
+            if not times.size:
+                report[poll.id] = {'responses': 0}
+                continue
+
+            elapsed = times - times.min()
+            hist, edges = np.histogram(elapsed, bins=bins)
+            report[poll.id] = {
+                'responses': int(times.size),
+                'mean': float(elapsed.mean()),
+                'percentiles': dict(zip(
+                    (f'p{p}' for p in PERCENTILES),
+                    np.percentile(elapsed, PERCENTILES).round(3).tolist()
+                )),
+                'histogram': {'counts': hist.tolist(), 'edges': edges.round(3).tolist()}
+            }
+        return report
+
+    def report(self):
+        """Session overview: responses, funnel and response times (computed once)"""
+        if self._report is None:
+            self._report = self._build_report()
+        return self._report
+
+    def _build_report(self):
+        return {
+            'participants': self.participants,
+            'polls': [{
+                'id': poll.id,
+                'slide_number': poll.slide_number,
+                'question': poll.question,
+                'poll_type': poll.poll_type,
+                'options': poll.options,
+                'responses': int(self.voted[:, q].sum())
+            } for q, poll in enumerate(self.polls)],
+            'funnel': self.funnel(),
+            'response_times': self.response_times()
+        }
+
+
+class AnalyticsCache:
+    """LRU of SessionMatrix per ended session.
+
+    Entries are keyed by the session's total vote count too (one SUM over
+    the maintained Poll.vote_count), so a late vote simply rebuilds the
+    matrix. Active sessions are never cached.
+    """
+
+    def __init__(self, maxsize=32):
+        self.maxsize = maxsize
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+    def init_app(self, app):
+        self.maxsize = app.config.get('ANALYTICS_CACHE_SIZE', self.maxsize)
+
+    def matrix(self, info):
+        """SessionMatrix for a resolved session (SessionInfo)"""
+        from app.models import Poll
+
+        if info.is_active:
+            return SessionMatrix(info.id)
+
+        votes = db.session.query(func.coalesce(func.sum(Poll.vote_count), 0)).filter(
+            Poll.session_id == info.id
+        ).scalar()
+        with self._lock:
+            entry = self._entries.get(info.id)
+            if entry is not None and entry[0] == votes:
+                self._entries.move_to_end(info.id)
+                return entry[1]
+
+        matrix = SessionMatrix(info.id)
+        with self._lock:
+            self._entries[info.id] = (votes, matrix)
+            self._entries.move_to_end(info.id)
+            while len(self._entries) > self.maxsize:
+                self._entries.popitem(last=False)
+        return matrix
+
+    def invalidate(self, session_id):
+        with self._lock:
+            self._entries.pop(session_id, None)
+
+
+analytics_cache = AnalyticsCache()
@@ -0,0 +1,155 @@
+# app/services/broadcast.py
+
+import threading
+from collections import Counter
+
+
+class BroadcastScheduler:
+    """Coalesces new_vote events per poll into one emit per tick.
+
+    Votes only mark their poll as dirty; a single background task wakes up
+    every VOTE_BROADCAST_INTERVAL seconds and sends one compact delta per
+    dirty poll to its room. The delta is collected by the tally itself and
+    drained together with the total under one lock, so no vote can land in
+    both a snapshot and the following delta. Every VOTE_BROADCAST_SNAPSHOT_EVERY-th emit for a
+    poll carries the full results instead, so clients that missed a delta
+    converge again. open_ended polls never send results: each emit only
+    carries the new total, and the dashboard pages the answers from the
+    database by Vote.id. Participant joins and leaves are folded the same way
+    into one participant_count per room per tick.
+
+    new_vote goes to the presenter room only; the audience room just gets
+    participant_count.
+
+    With several workers (SOCKETIO_MESSAGE_QUEUE) each one only tallies its
+    own votes, so total_votes is read from Poll.vote_count and tallies are
+    re-seeded from the database right before a snapshot; deltas still come
+    from the worker that recorded the vote.
+    """
+
+    def __init__(self):
+        self.app = None
+        self.interval = 0.15
+        self.snapshot_every = 20
+        self.shared = False
+        self._dirty = set()
+        self._rooms = {}
+        self._emits = Counter()
+        self._lock = threading.Lock()
+        self._task = None
+
+    def init_app(self, app):
+        self.app = app
+        self.interval = app.config.get('VOTE_BROADCAST_INTERVAL', self.interval)
+        self.snapshot_every = max(1, app.config.get('VOTE_BROADCAST_SNAPSHOT_EVERY', self.snapshot_every))
+        self.shared = bool(app.config.get('SOCKETIO_MESSAGE_QUEUE'))
+        app.extensions['broadcast_scheduler'] = self
+
+    def vote(self, tally):
+        """Mark a poll whose tally just recorded a vote for the next tick"""
+        with self._lock:
+            self._dirty.add(tally.poll_id)
+            self._wake()
+
+    def participants(self, room, session_id, joined=0, left=0):
+        """Queue a participant_count update for a session (room = its code)"""
+        with self._lock:
+            entry = self._rooms.setdefault(room, [session_id, 0, 0])
+            entry[1] += joined
+            entry[2] += left
+            self._wake()
+
+    def _wake(self):
+        # Caller holds self._lock
+        if self._task is None:
+            from app import socketio
+            self._task = socketio.start_background_task(self._run)
+
+    def forget(self, *poll_ids):
+        with self._lock:
+            for poll_id in poll_ids:
+                self._dirty.discard(poll_id)
+                self._emits.pop(poll_id, None)
+
+    def _run(self):
+        from app import socketio
+
+        while True:
+            socketio.sleep(self.interval)
+            try:
+                self.flush()
+            except Exception as e:
+                self.app.logger.error('Broadcast flush error: %s', e)
+
+    def _drain(self, poll_ids):
+        """(drained, new_vote payload) for every poll with undrained votes"""
+        from sqlalchemy.orm import joinedload
+        from app import db
+        from app.models import Poll
+        from app.services.tally import tally_engine
+
+        emits = []
+        for poll_id in poll_ids:
+            # First emit and every K-th one carry the full picture
+            seq = self._emits[poll_id] + 1
+            full = (seq - 1) % self.snapshot_every == 0
+            if full and self.shared:
+                poll = db.session.get(Poll, poll_id, options=[joinedload(Poll.session)])
+                if poll is not None:
+                    tally_engine.reconcile(poll)
+            drained = tally_engine.drain(poll_id, full)
+            if drained is None:
+                # Already sent with an earlier tick
+                continue
+            self._emits[poll_id] = seq
+
+            payload = {
+                'poll_id': poll_id,
+                'seq': seq,
+                'votes': drained['votes'],
+                'total_votes': drained['total_votes'],
+                'answer': drained['answer']
+            }
+            if drained['results'] is not None:
+                payload['results'] = drained['results']
+            elif drained['delta'] is not None:
+                payload['delta'] = dict(drained['delta'])
+            emits.append((drained, payload))
+
+        if self.shared and emits:
+            # This worker's tally total only counts its own votes
+            totals = dict(db.session.query(Poll.id, Poll.vote_count).filter(
+                Poll.id.in_([payload['poll_id'] for _, payload in emits])))
+            for _, payload in emits:
+                payload['total_votes'] = totals.get(payload['poll_id'], payload['total_votes'])
+        return emits
+
+    def flush(self):
+        """Emit everything collected since the previous tick"""
+        from app import socketio
+        from app.sockets.rooms import presenter_room, audience_room
+
+        with self._lock:
+            dirty, self._dirty = self._dirty, set()
+            rooms, self._rooms = self._rooms, {}
+
+        if dirty:
+            with self.app.app_context():
+                emits = self._drain(dirty)
+            for drained, payload in emits:
+                socketio.emit('new_vote', payload, room=presenter_room(drained['room']))
+
+        if rooms:
+            from app.services.presence import presence
+            with self.app.app_context():
+                for room, (session_id, joined, left) in rooms.items():
+                    count = presence.count(session_id)
+                    socketio.emit('participant_count', {
+                        'count': count,
+                        'joined': joined,
+                        'left': left
+                    }, room=presenter_room(room))
+                    socketio.emit('participant_count', {'count': count}, room=audience_room(room))
+
+
+broadcast_scheduler = BroadcastScheduler()
@@ -0,0 +1,68 @@
+# app/services/choices.py
+
+import numpy as np
+
+CHOICE_TYPES = ('multiple_choice', 'rating_scale')
+
+# Vote.choice_mask is a BigInteger: bit i set = option i selected
+MAX_OPTIONS = 63
+
+
+def encode_choice(options, answer=None, indices=None, allow_multiple=False):
+    """Bitmask for a choice vote given option indices or option text(s).
+
+    Raises ValueError for unknown options, an empty selection, or several
+    options on a single-choice poll.
+    """
+    if indices is None:
+        texts = answer if isinstance(answer, list) else [answer]
+        try:
+            indices = [options.index(text) for text in texts]
+        except ValueError:
+            raise ValueError('Unknown option')
+    elif not isinstance(indices, list):
+        indices = [indices]
+
+    mask = 0
+    for index in indices:
+        if not isinstance(index, int) or isinstance(index, bool) or not 0 <= index < min(len(options), MAX_OPTIONS):
+            raise ValueError('Unknown option')
+        mask |= 1 << index
+
+    if not mask:
+        raise ValueError('No option selected')
+    if not allow_multiple and mask & (mask - 1):
+        raise ValueError('Only one option may be selected')
+    return mask
+
+
+def mask_indices(mask):
+    """Option indices set in a mask, lowest first"""
+    indices = []
+    while mask:
+        low = mask & -mask
+        indices.append(low.bit_length() - 1)
+        mask ^= low
+    return indices
+
+
+def decode_choice(options, mask):
+    """Option texts selected by a mask"""
+    return [options[i] for i in mask_indices(mask or 0) if i < len(options)]
+
+
+def choice_counts(n_options, masks, weights=None):
+    """Per-option counts for many masks at once.
+
+    masks/weights are parallel sequences (e.g. from GROUP BY choice_mask);
+    each mask is expanded to its bit row and the rows are summed in one
+    matrix product instead of a Python loop per vote.
+    """
+    n_options = min(n_options, MAX_OPTIONS)
+    if not len(masks) or not n_options:
+        return np.zeros(n_options, dtype=np.int64)
+
+    masks = np.asarray(masks, dtype=np.int64)
+    weights = np.ones(len(masks), dtype=np.int64) if weights is None else np.asarray(weights, dtype=np.int64)
+    bits = (masks[:, None] >> np.arange(n_options, dtype=np.int64)) & 1
+    return weights @ bits
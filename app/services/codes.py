@@ -0,0 +1,121 @@
+# app/services/codes.py
+
+import hashlib
+import threading
+from sqlalchemy import select, update, insert
+from sqlalchemy.exc import IntegrityError
+from app import db
+
+CODE_ALPHABET = '0123456789ABCDEFGHIJKLMNOPQRSTUVWXYZ'
+CODE_LENGTH = 6
+CODE_SPACE = len(CODE_ALPHABET) ** CODE_LENGTH  # 36^6 = 2,176,782,336
+
+COUNTER_NAME = 'session_code'
+FEISTEL_ROUNDS = 4
+
+
+class CodePermutation:
+    """Keyed bijection of [0, 36^6) onto itself.
+
+    A 4-round Feistel network over 32 bits (16-bit halves, keyed BLAKE2b as
+    the round function) is a permutation of [0, 2^32); cycle-walking (apply
+    again until the value falls below 36^6) restricts it to the code space.
+    36^6 / 2^32 is about 0.51, so that is two rounds of walking on average.
+    Consecutive indices map to unrelated-looking codes, and distinct
+    indices can never collide.
+    """
+
+    def __init__(self, key):
+        self.key = hashlib.sha256(key.encode() if isinstance(key, str) else key).digest()
+
+    def _round(self, value, round_index):
+        digest = hashlib.blake2b(
+            value.to_bytes(2, 'big') + bytes([round_index]), key=self.key, digest_size=2
+        ).digest()
+        return int.from_bytes(digest, 'big')
+
+    def _feistel(self, value):
+        left, right = value >> 16, value & 0xFFFF
+        for round_index in range(FEISTEL_ROUNDS):
+            left, right = right, left ^ self._round(right, round_index)
+        return (left << 16) | right
+
+    def __call__(self, index):
+        if not 0 <= index < CODE_SPACE:
+            raise ValueError('Code index out of range')
+        value = self._feistel(index)
+        while value >= CODE_SPACE:
+            value = self._feistel(value)
+        return value
+
+
+def encode_code(value):
+    chars = []
+    for _ in range(CODE_LENGTH):
+        value, digit = divmod(value, len(CODE_ALPHABET))
+        chars.append(CODE_ALPHABET[digit])
+    return ''.join(reversed(chars))
+
+
+class CodeAllocator:
+    """Collision-free session codes without retry queries.
+
+    Codes are permutation(index) for a global, ever-increasing index. Each
+    process reserves SESSION_CODE_BLOCK_SIZE indices at a time from the
+    code_counters row (one UPDATE in its own transaction, so workers never
+    share a block) and hands them out from memory. Codes issued before the
+    allocator existed were random, so every reserved block is checked
+    against sessions.code once and the few taken codes are skipped.
+    """
+
+    def __init__(self):
+        self.app = None
+        self.block_size = 1000
+        self.permutation = None
+        self._codes = []
+        self._lock = threading.Lock()
+
+    def init_app(self, app):
+        self.app = app
+        self.block_size = max(1, app.config.get('SESSION_CODE_BLOCK_SIZE', self.block_size))
+        self.permutation = CodePermutation(app.config.get('SESSION_CODE_KEY') or app.config['SECRET_KEY'])
+
+    def allocate(self):
+        """Next unused session code"""
+        with self._lock:
+            while not self._codes:
+                self._codes = self._reserve()
+            return self._codes.pop()
+
+    def _reserve(self):
+        from app.models import CodeCounter, Session
+
+        counter = CodeCounter.__table__
+        with db.engine.begin() as conn:
+            updated = conn.execute(update(counter).where(counter.c.name == COUNTER_NAME).values(
+                next_index=counter.c.next_index + self.block_size
+            ))
+            if updated.rowcount:
+                end = conn.execute(select(counter.c.next_index).where(counter.c.name == COUNTER_NAME)).scalar()
+
+        if not updated.rowcount:
+            # First block ever: create the counter row
+            try:
+                with db.engine.begin() as conn:
+                    conn.execute(insert(counter).values(name=COUNTER_NAME, next_index=self.block_size))
+            except IntegrityError:
+                # Another worker created it first; reserve again
+                return []
+            end = self.block_size
+
+        start = end - self.block_size
+        if start >= CODE_SPACE:
+            raise RuntimeError('Session code space exhausted')
+        codes = [encode_code(self.permutation(index)) for index in range(start, min(end, CODE_SPACE))]
+
+        taken = set(db.session.execute(select(Session.code).where(Session.code.in_(codes))).scalars())
+        # pop() hands them out from the end; keep index order
+        return [code for code in reversed(codes) if code not in taken]
+
+
+code_allocator = CodeAllocator()
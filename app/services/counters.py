@@ -0,0 +1,54 @@
+# app/services/counters.py
+
+from sqlalchemy import func, select, update, true
+from app import db
+
+
+def bump_poll_votes(poll_id, delta=1):
+    from app.models import Poll
+    db.session.execute(
+        update(Poll).where(Poll.id == poll_id).values(vote_count=Poll.vote_count + delta)
+    )
+
+
+def bump_user_sessions(user_id, delta=1):
+    from app.models import User
+    from app.services.user_cache import user_cache
+    db.session.execute(
+        update(User).where(User.id == user_id).values(session_count=User.session_count + delta)
+    )
+    user_cache.invalidate(user_id)
+
+
+def recount_poll_votes(poll_ids=None):
+    """Recompute Poll.vote_count from the votes table (all polls when None)"""
+    from app.models import Poll, Vote
+
+    stmt = update(Poll).values(vote_count=select(func.count(Vote.id)).where(
+        Vote.poll_id == Poll.id
+    ).scalar_subquery())
+    if poll_ids is not None:
+        stmt = stmt.where(Poll.id.in_(list(poll_ids)))
+    db.session.execute(stmt)
+
+
+def repair_counters():
+    """Recompute every denormalized counter in bulk (one UPDATE per column)"""
+    from app.models import User, Session, Poll, Participant
+
+    recount_poll_votes()
+    db.session.execute(update(Session).values(
+        poll_count=select(func.count(Poll.id)).where(
+            Poll.session_id == Session.id
+        ).scalar_subquery(),
+        online_count=select(func.count(Participant.id)).where(
+            Participant.session_id == Session.id,
+            Participant.is_online == true()
+        ).scalar_subquery()
+    ))
+    db.session.execute(update(User).values(
+        session_count=select(func.count(Session.id)).where(
+            Session.user_id == User.id
+        ).scalar_subquery()
+    ))
+    db.session.commit()
@@ -0,0 +1,101 @@
+# app/services/deck_cache.py
+
+import threading
+import time
+from collections import OrderedDict
+
+
+class Deck:
+    """A session's polls compiled once into slide order"""
+
+    def __init__(self, payloads, expires=None):
+        self.payloads = payloads
+        self.expires = expires
+        self.by_number = {payload['slide_number']: index for index, payload in enumerate(payloads)}
+
+    def __len__(self):
+        return len(self.payloads)
+
+
+class DeckCache:
+    """Ordered, pre-serialized participant payloads per session.
+
+    slide_changed and session_joined look slides up here instead of sorting
+    session.polls and calling Poll.to_dict() for every emit. Only
+    total_votes changes after a session is created, and it is patched in
+    from the tally engine's counters when a payload is handed out.
+
+    Edits invalidate the deck in the process that made them; other workers
+    pick them up once the deck is DECK_CACHE_TTL seconds old (0 = never
+    expires, for a single process). At most DECK_CACHE_SIZE decks are kept,
+    least recently used first out; ended sessions drop theirs right away.
+    """
+
+    def __init__(self, ttl=0, maxsize=500):
+        self.ttl = ttl
+        self.maxsize = maxsize
+        self._decks = OrderedDict()
+        self._lock = threading.Lock()
+
+    def init_app(self, app):
+        self.ttl = app.config.get('DECK_CACHE_TTL', self.ttl)
+        self.maxsize = max(1, app.config.get('DECK_CACHE_SIZE', self.maxsize))
+
+    def _fresh(self, deck):
+        return deck is not None and (deck.expires is None or deck.expires > time.monotonic())
+
+    def _compile(self, session_id):
+        from app.models import Poll
+        from app.services.tally import tally_engine
+
+        polls = Poll.query.filter_by(session_id=session_id).order_by(Poll.slide_number).all()
+        payloads = []
+        for poll in polls:
+            tally_engine.ensure(poll)
+            payload = poll.to_dict()
+            payload.pop('total_votes', None)
+            payloads.append(payload)
+        return Deck(payloads, time.monotonic() + self.ttl if self.ttl else None)
+
+    def get(self, session_id):
+        with self._lock:
+            deck = self._decks.get(session_id)
+            if self._fresh(deck):
+                self._decks.move_to_end(session_id)
+                return deck
+
+            deck = self._decks[session_id] = self._compile(session_id)
+            self._decks.move_to_end(session_id)
+            while len(self._decks) > self.maxsize:
+                self._decks.popitem(last=False)
+            return deck
+
+    def _payload(self, deck, index):
+        from app.services.tally import tally_engine
+
+        payload = dict(deck.payloads[index])
+        tally = tally_engine.lookup(payload['id'])
+        payload['total_votes'] = tally.total if tally else 0
+        return payload
+
+    def slide(self, session_id, index):
+        """Participant payload for the slide at a 0-based position, or None"""
+        deck = self.get(session_id)
+        if index is None or not 0 <= index < len(deck):
+            return None
+        return self._payload(deck, index)
+
+    def slide_number(self, session_id, number):
+        """Participant payload for a poll by its slide_number, or None"""
+        deck = self.get(session_id)
+        index = deck.by_number.get(number)
+        if index is None:
+            return None
+        return self._payload(deck, index)
+
+    def invalidate(self, session_id):
+        with self._lock:
+            self._decks.pop(session_id, None)
+
+
+deck_cache = DeckCache()
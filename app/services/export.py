@@ -0,0 +1,165 @@
+# app/services/export.py
+
+import csv
+import io
+import json
+from app import db
+from app.services.choices import CHOICE_TYPES, decode_choice
+
+EXPORT_COLUMNS = [
+    'session_code', 'session_title', 'slide_number', 'question', 'poll_type',
+    'participant', 'answer', 'voted_at'
+]
+
+# Rows fetched per round trip from the server-side cursor, and rows per
+# CSV/JSONL chunk or Parquet row group
+FETCH_SIZE = 1000
+
+EXPORT_FORMATS = {
+    'csv': 'text/csv',
+    'jsonl': 'application/x-ndjson',
+    'parquet': 'application/vnd.apache.parquet',
+}
+
+
+def export_rows(session_ids):
+    """Yield one dict per vote of the given sessions, in a stable order.
+
+    Poll and session metadata is loaded once up front; the votes themselves
+    are streamed with yield_per, so memory does not grow with the number
+    of votes.
+    """
+    from app.models import Session, Poll, Vote, Participant
+
+    if not session_ids:
+        return
+
+    polls = {}
+    rows = db.session.query(
+        Poll.id, Poll.slide_number, Poll.question, Poll.poll_type, Poll.options,
+        Session.code, Session.title
+    ).join(Session, Poll.session_id == Session.id).filter(Session.id.in_(session_ids))
+    for row in rows:
+        polls[row.id] = row
+
+    votes = db.session.query(
+        Vote.poll_id, Vote.answer, Vote.choice_mask, Vote.voted_at, Participant.identifier
+    ).join(Participant, Vote.participant_id == Participant.id).filter(
+        Vote.poll_id.in_(list(polls))
+    ).order_by(Vote.poll_id, Vote.id).execution_options(yield_per=FETCH_SIZE)
+
+    for vote in votes:
+        poll = polls[vote.poll_id]
+        answer = vote.answer
+        if poll.poll_type in CHOICE_TYPES and vote.choice_mask is not None:
+            answer = '; '.join(decode_choice(poll.options or [], vote.choice_mask))
+        yield {
+            'session_code': poll.code,
+            'session_title': poll.title,
+            'slide_number': poll.slide_number,
+            'question': poll.question,
+            'poll_type': poll.poll_type,
+            'participant': vote.identifier,
+            'answer': answer,
+            'voted_at': vote.voted_at.isoformat() if vote.voted_at else None
+        }
+
+
+def _chunks(rows, size=FETCH_SIZE):
+    chunk = []
+    for row in rows:
+        chunk.append(row)
+        if len(chunk) >= size:
+            yield chunk
+            chunk = []
+    if chunk:
+        yield chunk
+
+
+def stream_csv(rows):
+    buffer = io.StringIO()
+    writer = csv.DictWriter(buffer, fieldnames=EXPORT_COLUMNS)
+    writer.writeheader()
+    for chunk in _chunks(rows):
+        writer.writerows(chunk)
+        yield buffer.getvalue()
+        buffer.seek(0)
+        buffer.truncate()
+    if buffer.tell():
+        yield buffer.getvalue()
+
+
+def stream_jsonl(rows):
+    for chunk in _chunks(rows):
+        yield ''.join(json.dumps(row, ensure_ascii=False) + '\n' for row in chunk)
+
+
+class _StreamSink:
+    """Write-only file for pyarrow that hands out bytes as they are written.
+
+    tell() counts every byte ever written, so the Parquet footer offsets stay
+    right even though the buffer is drained after each row group.
+    """
+
+    closed = False
+
+    def __init__(self):
+        self._parts = []
+        self._written = 0
+
+    def write(self, data):
+        self._parts.append(bytes(data))
+        self._written += len(data)
+        return len(data)
+
+    def tell(self):
+        return self._written
+
+    def flush(self):
+        pass
+
+    def close(self):
+        self.closed = True
+
+    def drain(self):
+        data, self._parts = b''.join(self._parts), []
+        return data
+
+
+def stream_parquet(rows):
+    """One row group per FETCH_SIZE rows (needs the optional pyarrow package)"""
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+
+    schema = pa.schema([
+        ('session_code', pa.string()),
+        ('session_title', pa.string()),
+        ('slide_number', pa.int32()),
+        ('question', pa.string()),
+        ('poll_type', pa.string()),
+        ('participant', pa.string()),
+        ('answer', pa.string()),
+        ('voted_at', pa.string()),
+    ])
+
+    sink = _StreamSink()
+    with pq.ParquetWriter(pa.PythonFile(sink, mode='w'), schema) as writer:
+        for chunk in _chunks(rows):
+            writer.write_table(pa.Table.from_pylist(chunk, schema=schema))
+            yield sink.drain()
+    yield sink.drain()
+
+
+def parquet_available():
+    try:
+        import pyarrow.parquet  # noqa: F401
+    except ImportError:
+        return False
+    return True
+
+
+STREAMERS = {
+    'csv': stream_csv,
+    'jsonl': stream_jsonl,
+    'parquet': stream_parquet,
+}
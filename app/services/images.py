@@ -0,0 +1,173 @@
+# app/services/images.py
+
+import os
+import threading
+from PIL import Image, ImageOps
+
+# Rendition formats, in <picture>/srcset preference order: (format, ext, save options)
+RENDITION_FORMATS = (
+    ('WEBP', 'webp', {'quality': 80, 'method': 4}),
+    ('JPEG', 'jpg', {'quality': 82, 'optimize': True, 'progressive': True}),
+)
+
+
+def render_renditions(path, widths):
+    """Decode an upload once and write a WebP and a JPEG for every width.
+
+    Widths at or above the original width collapse into one rendition at
+    the original size, so small images are re-encoded but never upscaled.
+    Animated GIFs are left alone. Returns {ext: [(width, filepath), ...]}.
+    """
+    with Image.open(path) as image:
+        if getattr(image, 'is_animated', False):
+            return {}
+
+        image = ImageOps.exif_transpose(image)
+        if image.mode in ('RGBA', 'LA', 'PA') or 'transparency' in image.info:
+            # Flatten transparency onto white (JPEG has no alpha)
+            rgba = image.convert('RGBA')
+            image = Image.new('RGB', rgba.size, 'white')
+            image.paste(rgba, mask=rgba.getchannel('A'))
+        elif image.mode != 'RGB':
+            image = image.convert('RGB')
+
+        targets = sorted({min(width, image.width) for width in widths})
+        stem = os.path.splitext(path)[0]
+        renditions = {ext: [] for _, ext, _ in RENDITION_FORMATS}
+        for width in reversed(targets):
+            height = max(1, round(image.height * width / image.width))
+            # Each step down resizes the previous (already smaller) rendition
+            image = image.resize((width, height), Image.LANCZOS, reducing_gap=3.0)
+            for fmt, ext, options in RENDITION_FORMATS:
+                target = f'{stem}_{width}w.{ext}'
+                image.save(target, fmt, **options)
+                renditions[ext].append((width, target))
+
+    for items in renditions.values():
+        items.reverse()
+    return renditions
+
+
+class ImagePipeline:
+    """Background resizing of slide images.
+
+    create_session_api only stores the original upload and calls submit()
+    after the commit; decoding and encoding happen on a background task, at
+    most IMAGE_WORKERS at a time (under eventlet the Pillow work runs in
+    eventlet's native thread pool so the hub keeps serving sockets). Work
+    is per UploadBlob, so an image shared by many polls is resized once.
+    When it is done the renditions are stored on the blob and on every
+    poll showing it, and those sessions' decks are recompiled so later
+    slide_changed / session_joined payloads carry the srcset.
+    """
+
+    def __init__(self):
+        self.app = None
+        self.widths = (320, 640, 1280)
+        self._slots = threading.BoundedSemaphore(2)
+        self._pending = set()
+        self._late = set()
+        self._lock = threading.Lock()
+
+    def init_app(self, app):
+        self.app = app
+        widths = app.config.get('IMAGE_RENDITION_WIDTHS') or self.widths
+        self.widths = tuple(sorted({int(width) for width in widths}))
+        self._slots = threading.BoundedSemaphore(max(1, app.config.get('IMAGE_WORKERS', 2)))
+
+    def submit(self, digest, path):
+        """Render a blob's renditions in the background (once at a time per blob).
+
+        Polls created with the image while it is being processed get the
+        renditions from one more pass over the polls once it is done; a blob
+        that already has renditions is never resized again.
+        """
+        from app import socketio
+        with self._lock:
+            if digest in self._pending:
+                self._late.add(digest)
+                return
+            self._pending.add(digest)
+        socketio.start_background_task(self._process, digest, path)
+
+    def _execute(self, fn, *args):
+        from app import socketio
+        if socketio.async_mode == 'eventlet':
+            from eventlet import tpool
+            return tpool.execute(fn, *args)
+        return fn(*args)
+
+    def _process(self, digest, path):
+        from app import db
+        from app.models import UploadBlob
+        from app.services.media import MEDIA_URL_PREFIX
+
+        try:
+            with self.app.app_context():
+                blob = db.session.get(UploadBlob, digest)
+                renditions = blob.renditions if blob is not None else None
+
+            if renditions is None:
+                with self._slots:
+                    try:
+                        rendered = self._execute(render_renditions, path, self.widths)
+                    except Exception as e:
+                        self.app.logger.error('Error processing image %s: %s', path, e)
+                        return
+                # Stored as {} for images that are served as-is (animated GIFs)
+                renditions = {
+                    ext: [{'width': width, 'url': MEDIA_URL_PREFIX + os.path.basename(target)}
+                          for width, target in items]
+                    for ext, items in rendered.items()
+                }
+
+            while True:
+                with self.app.app_context():
+                    self._finish(digest, renditions)
+                # Polls created with the image since the pass above get
+                # another one; checked and cleared under the lock submit() uses
+                with self._lock:
+                    if digest not in self._late:
+                        self._pending.discard(digest)
+                        return
+                    self._late.discard(digest)
+        finally:
+            with self._lock:
+                self._pending.discard(digest)
+                self._late.discard(digest)
+
+    def _finish(self, digest, renditions):
+        from app import db
+        from app.models import Poll, UploadBlob
+        from app.services.deck_cache import deck_cache
+        from app.services.media import media_store, MEDIA_URL_PREFIX
+
+        blob = db.session.get(UploadBlob, digest)
+        if blob is None:
+            # Every poll using it was deleted while the image was processing
+            media_store.discard(*(media_store.path(item['url'][len(MEDIA_URL_PREFIX):])
+                                  for items in renditions.values() for item in items))
+            return
+
+        blob.renditions = renditions
+        session_ids = [row.session_id for row in db.session.query(Poll.session_id).filter(
+            Poll.image_url == blob.url
+        ).distinct()]
+        if blob.renditions:
+            Poll.query.filter(Poll.image_url == blob.url).update(
+                {Poll.image_renditions: blob.renditions}, synchronize_session=False
+            )
+        db.session.commit()
+        for session_id in session_ids:
+            deck_cache.invalidate(session_id)
+
+
+def image_srcset(renditions, ext):
+    """'url 320w, url 640w' for one rendition format, or None"""
+    items = (renditions or {}).get(ext)
+    if not items:
+        return None
+    return ', '.join(f"{item['url']} {item['width']}w" for item in items)
+
+
+image_pipeline = ImagePipeline()
@@ -0,0 +1,158 @@
+# app/services/join_buffer.py
+
+import secrets
+import threading
+from datetime import datetime
+from sqlalchemy import insert
+from app import db
+
+
+class _PendingJoin:
+    """A join_session waiting for the next flush"""
+
+    __slots__ = ('sid', 'session_code', 'identifier')
+
+    def __init__(self, sid, session_code, identifier):
+        self.sid = sid
+        self.session_code = session_code
+        self.identifier = identifier
+
+
+class JoinBuffer:
+    """Batches participant joins so a join wave costs a handful of queries.
+
+    join_session only queues the socket. Every PARTICIPANT_FLUSH_INTERVAL
+    seconds, or once PARTICIPANT_FLUSH_BATCH_SIZE joins are waiting, the
+    queue is resolved at once: returning participants are looked up by
+    identifier in one query, new ones are inserted with one executemany and
+    read back by identifier, then each socket gets its session_joined (or
+    join_failed if the batch could not be written, which the client retries
+    with backoff). Room counts go out through the broadcast scheduler, once
+    per tick.
+    """
+
+    def __init__(self):
+        self.app = None
+        self.batch_size = 200
+        self.interval = 0.2
+        self._pending = {}
+        self._lock = threading.Lock()
+        self._flush_lock = threading.Lock()
+        self._task = None
+
+    def init_app(self, app):
+        self.app = app
+        self.batch_size = max(1, app.config.get('PARTICIPANT_FLUSH_BATCH_SIZE', self.batch_size))
+        self.interval = app.config.get('PARTICIPANT_FLUSH_INTERVAL', self.interval)
+        app.extensions['join_buffer'] = self
+
+    def submit(self, sid, session_code, identifier=None):
+        """Queue a socket's join; a second join from the same sid replaces it"""
+        with self._lock:
+            self._pending[sid] = _PendingJoin(sid, session_code, identifier)
+            full = len(self._pending) >= self.batch_size
+
+            if self._task is None:
+                from app import socketio
+                self._task = socketio.start_background_task(self._run)
+
+        if full:
+            self.flush()
+
+    def cancel(self, sid):
+        """Forget a queued join whose socket disconnected before the flush"""
+        with self._lock:
+            return self._pending.pop(sid, None) is not None
+
+    def _run(self):
+        from app import socketio
+
+        while True:
+            socketio.sleep(self.interval)
+            self.flush()
+
+    def flush(self):
+        """Create or look up every queued participant and answer its socket"""
+        from app import socketio
+
+        with self._flush_lock:
+            with self._lock:
+                joins, self._pending = list(self._pending.values()), {}
+            if not joins:
+                return 0
+
+            try:
+                with self.app.app_context():
+                    self._process(joins)
+            except Exception as e:
+                self.app.logger.error('Join flush error: %s', e)
+                # join.html answers join_failed by re-sending join_session with backoff
+                for join in joins:
+                    socketio.emit('join_failed', {'message': 'Join failed, please retry'}, to=join.sid)
+            return len(joins)
+
+    def _process(self, joins):
+        from app import socketio
+        from app.models import Participant
+        from app.services.broadcast import broadcast_scheduler
+        from app.services.deck_cache import deck_cache
+        from app.services.presence import presence
+        from app.services.session_resolver import session_resolver
+        from app.services.session_stats import stats_cache
+
+        # Returning participants, one query for the whole batch
+        known = {}
+        wanted = [join.identifier for join in joins if join.identifier]
+        if wanted:
+            rows = db.session.query(Participant.id, Participant.identifier, Participant.session_id).filter(
+                Participant.identifier.in_(wanted)
+            ).all()
+            known = {row.identifier: (row.id, row.session_id) for row in rows}
+
+        ready = []
+        new_rows = []
+        now = datetime.utcnow()
+        for join in joins:
+            info = session_resolver.resolve(join.session_code)
+            if info is None:
+                socketio.emit('error', {'message': 'Invalid session'}, to=join.sid)
+                continue
+
+            found = known.get(join.identifier)
+            if found is None or found[1] != info.id:
+                # New participant (is_online/online_count are synced by presence)
+                join.identifier = secrets.token_hex(8)
+                new_rows.append({
+                    'session_id': info.id,
+                    'identifier': join.identifier,
+                    'is_online': False,
+                    'joined_at': now
+                })
+            ready.append((join, info))
+
+        if new_rows:
+            db.session.execute(insert(Participant), new_rows)
+            db.session.commit()
+            rows = db.session.query(Participant.id, Participant.identifier, Participant.session_id).filter(
+                Participant.identifier.in_([row['identifier'] for row in new_rows])
+            ).all()
+            known.update({row.identifier: (row.id, row.session_id) for row in rows})
+
+        for join, info in ready:
+            participant_id = known[join.identifier][0]
+            if presence.join(join.sid, info.id, participant_id, join.session_code, info.user_id):
+                stats_cache.bump(info.user_id, participants=1)
+                broadcast_scheduler.participants(join.session_code, info.id, joined=1)
+
+            # Current poll from the compiled deck, as of this flush
+            socketio.emit('session_joined', {
+                'participant_id': participant_id,
+                'participant_identifier': join.identifier,
+                'current_slide': info.current_slide_index,
+                'total_slides': info.total_polls,
+                'current_poll': deck_cache.slide_number(info.id, info.current_slide_index + 1),
+                'heartbeat_interval': presence.heartbeat_interval
+            }, to=join.sid)
+
+
+join_buffer = JoinBuffer()
@@ -0,0 +1,176 @@
+# app/services/media.py
+
+import hashlib
+import mimetypes
+import os
+import re
+import uuid
+from flask import Response, abort, current_app, request
+from sqlalchemy import update, delete
+from sqlalchemy.exc import IntegrityError
+from werkzeug.utils import send_file
+from app import db
+
+MEDIA_URL_PREFIX = '/media/'
+
+# <sha256>.<ext> for originals, <sha256>_<width>w.<ext> for renditions
+MEDIA_NAME = re.compile(r'^[0-9a-f]{64}(?:_\d+w)?\.[a-z0-9]+$')
+
+CHUNK_SIZE = 64 * 1024
+
+
+def file_digest(stream):
+    """SHA-256 of a file-like object, read in chunks; rewinds it afterwards"""
+    digest = hashlib.sha256()
+    size = 0
+    stream.seek(0)
+    for chunk in iter(lambda: stream.read(CHUNK_SIZE), b''):
+        digest.update(chunk)
+        size += len(chunk)
+    stream.seek(0)
+    return digest.hexdigest(), size
+
+
+def is_media_url(url):
+    return bool(url) and url.startswith(MEDIA_URL_PREFIX)
+
+
+class MediaStore:
+    """Content-addressed storage for uploaded slide images.
+
+    Files live under MEDIA_FOLDER/<first 2 hex chars>/<sha256>.<ext>, with
+    their renditions next to them, so the same image uploaded to many
+    sessions is stored (and resized) once. UploadBlob.ref_count counts the
+    polls pointing at a blob; the files go when it drops to zero. Names
+    never change content, so /media responses are cacheable forever
+    (immutable) and the file name doubles as the ETag. MEDIA_SENDFILE
+    hands the transfer to the front proxy: 'x-sendfile' (Apache,
+    lighttpd) or 'x-accel' (nginx, internal location MEDIA_ACCEL_PREFIX
+    mapped to MEDIA_FOLDER).
+    """
+
+    def __init__(self):
+        self.folder = None
+        self.sendfile = ''
+        self.accel_prefix = '/_media/'
+        self.max_age = 365 * 24 * 3600
+
+    def init_app(self, app):
+        self.folder = os.path.abspath(app.config['MEDIA_FOLDER'])
+        self.sendfile = (app.config.get('MEDIA_SENDFILE') or '').lower()
+        self.accel_prefix = app.config.get('MEDIA_ACCEL_PREFIX', self.accel_prefix).rstrip('/') + '/'
+        self.max_age = app.config.get('MEDIA_MAX_AGE', self.max_age)
+        os.makedirs(self.folder, exist_ok=True)
+
+    def _relpath(self, name):
+        return f'{name[:2]}/{name}'
+
+    def path(self, name):
+        return os.path.join(self.folder, name[:2], name)
+
+    def store(self, file, ext):
+        """Take a reference to an upload, writing it only if its content is new.
+
+        Runs inside the caller's transaction. Returns the UploadBlob.
+        """
+        from app.models import UploadBlob
+
+        digest, size = file_digest(file.stream)
+        blob = db.session.get(UploadBlob, digest)
+        if blob is not None:
+            self._add_reference(digest)
+        else:
+            try:
+                with db.session.begin_nested():
+                    blob = UploadBlob(digest=digest, ext=ext, size=size, ref_count=1)
+                    db.session.add(blob)
+            except IntegrityError:
+                # A concurrent upload of the same file inserted it first; the
+                # savepoint kept the caller's transaction usable
+                self._add_reference(digest)
+                blob = db.session.get(UploadBlob, digest)
+
+        path = self.path(blob.filename)
+        if not os.path.exists(path):
+            # Write under a temporary name so readers never see a partial file
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+            partial = f'{path}.{uuid.uuid4().hex[:8]}.part'
+            file.save(partial)
+            os.replace(partial, path)
+        return blob
+
+    def _add_reference(self, digest):
+        from app.models import UploadBlob
+
+        db.session.execute(
+            update(UploadBlob).where(UploadBlob.digest == digest).values(ref_count=UploadBlob.ref_count + 1)
+        )
+
+    def release(self, counts):
+        """Drop references ({media url: polls}) inside the caller's transaction.
+
+        Returns the files of blobs nobody uses anymore; pass them to
+        discard() once the transaction has committed.
+        """
+        from app.models import UploadBlob
+
+        digests = {}
+        for url, count in counts.items():
+            digest = url[len(MEDIA_URL_PREFIX):].split('.', 1)[0]
+            digests[digest] = digests.get(digest, 0) + count
+        if not digests:
+            return []
+
+        for digest, count in digests.items():
+            db.session.execute(
+                update(UploadBlob).where(UploadBlob.digest == digest).values(ref_count=UploadBlob.ref_count - count)
+            )
+
+        orphans = UploadBlob.query.filter(
+            UploadBlob.digest.in_(list(digests)), UploadBlob.ref_count <= 0
+        ).all()
+        paths = []
+        for blob in orphans:
+            paths.append(self.path(blob.filename))
+            for items in (blob.renditions or {}).values():
+                paths.extend(self.path(item['url'][len(MEDIA_URL_PREFIX):]) for item in items)
+        if orphans:
+            db.session.execute(delete(UploadBlob).where(
+                UploadBlob.digest.in_([blob.digest for blob in orphans]), UploadBlob.ref_count <= 0
+            ))
+        return paths
+
+    def discard(self, *paths):
+        for path in paths:
+            try:
+                if os.path.exists(path):
+                    os.remove(path)
+            except OSError as e:
+                current_app.logger.warning('Error deleting media file: %s', e)
+
+    def send(self, name):
+        """Response for /media/<name>: immutable, ETag = name, 304 when unchanged"""
+        if not MEDIA_NAME.match(name):
+            abort(404)
+        path = self.path(name)
+        if not os.path.isfile(path):
+            abort(404)
+
+        if self.sendfile == 'x-accel':
+            response = Response(mimetype=mimetypes.guess_type(name)[0] or 'application/octet-stream')
+            response.headers['X-Accel-Redirect'] = self.accel_prefix + self._relpath(name)
+        else:
+            response = send_file(
+                path, request.environ, conditional=False, etag=False,
+                max_age=self.max_age, use_x_sendfile=self.sendfile == 'x-sendfile'
+            )
+
+        response.set_etag(name)
+        response.cache_control.no_cache = None
+        response.cache_control.public = True
+        response.cache_control.max_age = self.max_age
+        response.cache_control.immutable = True
+        return response.make_conditional(request)
+
+
+media_store = MediaStore()
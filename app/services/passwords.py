@@ -0,0 +1,80 @@
+# app/services/passwords.py
+
+import threading
+import bcrypt
+
+
+class PasswordHasherBusy(Exception):
+    """Too many password hashes queued; the caller should answer 503"""
+
+
+def bcrypt_cost(password_hash):
+    """Cost factor of a '$2b$12$...' hash, or None if it cannot be parsed"""
+    try:
+        return int(password_hash.split('$')[2])
+    except (AttributeError, IndexError, ValueError):
+        return None
+
+
+class PasswordHasher:
+    """bcrypt off the request path, with a bounded queue.
+
+    At most BCRYPT_WORKERS hashes run at once and BCRYPT_QUEUE_LIMIT more
+    may wait; beyond that hash()/verify() raise PasswordHasherBusy straight
+    away instead of tying up more workers, and the request gets a 503 with
+    Retry-After. bcrypt releases the GIL while hashing, so native threads
+    give real parallelism: under eventlet the work goes to eventlet's
+    thread pool (the hub keeps serving sockets), under threading it runs on
+    the request thread once it holds a worker slot. The cost factor is
+    BCRYPT_ROUNDS; needs_rehash() tells login to upgrade older hashes.
+    """
+
+    def __init__(self):
+        self.rounds = 12
+        self.retry_after = 1
+        self._workers = threading.BoundedSemaphore(2)
+        self._slots = threading.BoundedSemaphore(2 + 16)
+
+    def init_app(self, app):
+        self.rounds = app.config.get('BCRYPT_ROUNDS', self.rounds)
+        workers = max(1, app.config.get('BCRYPT_WORKERS', 2))
+        queue_limit = max(0, app.config.get('BCRYPT_QUEUE_LIMIT', 16))
+        self._workers = threading.BoundedSemaphore(workers)
+        self._slots = threading.BoundedSemaphore(workers + queue_limit)
+        app.register_error_handler(PasswordHasherBusy, self.busy_response)
+
+    def busy_response(self, error):
+        from flask import jsonify
+        response = jsonify({'success': False, 'error': 'Server sedang sibuk, coba lagi sebentar'})
+        response.status_code = 503
+        response.headers['Retry-After'] = str(self.retry_after)
+        return response
+
+    def _execute(self, fn, *args):
+        from app import socketio
+        if getattr(socketio, 'async_mode', None) == 'eventlet':
+            from eventlet import tpool
+            return tpool.execute(fn, *args)
+        return fn(*args)
+
+    def _run(self, fn, *args):
+        if not self._slots.acquire(blocking=False):
+            raise PasswordHasherBusy()
+        try:
+            with self._workers:
+                return self._execute(fn, *args)
+        finally:
+            self._slots.release()
+
+    def hash(self, password):
+        salt = bcrypt.gensalt(rounds=self.rounds)
+        return self._run(bcrypt.hashpw, password.encode('utf-8'), salt).decode('utf-8')
+
+    def verify(self, password, password_hash):
+        return self._run(bcrypt.checkpw, password.encode('utf-8'), password_hash.encode('utf-8'))
+
+    def needs_rehash(self, password_hash):
+        return bcrypt_cost(password_hash) != self.rounds
+
+
+password_hasher = PasswordHasher()
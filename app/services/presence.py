@@ -0,0 +1,277 @@
+# app/services/presence.py
+
+import atexit
+import threading
+import time
+from collections import Counter, defaultdict
+from sqlalchemy import func, update
+from app import db
+
+
+class _Presence:
+    """One connected participant socket"""
+
+    __slots__ = ('session_id', 'participant_id', 'room', 'owner_id', 'last_seen')
+
+    def __init__(self, session_id, participant_id, room, owner_id):
+        self.session_id = session_id
+        self.participant_id = participant_id
+        self.room = room
+        self.owner_id = owner_id
+        self.last_seen = time.monotonic()
+
+
+class PresenceRegistry:
+    """Maps socket sids to participants and keeps online counts in memory.
+
+    Joins, leaves, disconnects and missed heartbeats only touch the registry;
+    a background task writes the collected is_online flips and the
+    sessions.online_count changes in one transaction every
+    PRESENCE_SYNC_INTERVAL seconds. online_count only moves by the number
+    of rows whose flag actually flipped, so a participant already marked
+    online (by another worker, or before a crash) is not counted twice. In
+    a single process counts are the last value read back from the database
+    plus the unsynced delta. With several workers (SOCKETIO_MESSAGE_QUEUE)
+    every worker reports the synced online_count as is, so all of them
+    announce the same number. Sockets that send no heartbeat for
+    PRESENCE_TIMEOUT seconds are dropped by the same task.
+
+    The first sync after boot reconciles what an unclean exit left behind:
+    a single process marks every participant offline (none of them can be
+    connected yet), with several workers online_count is recounted from the
+    is_online flags.
+    """
+
+    def __init__(self):
+        self.app = None
+        self.heartbeat_interval = 20
+        self.timeout = 60
+        self.sync_interval = 2.0
+        self.shared = False
+        self._sids = {}
+        self._by_participant = {}
+        self._counts = {}
+        self._rooms = {}
+        self._deltas = Counter()
+        self._inflight = Counter()
+        self._changes = {}
+        self._reconciled = False
+        self._lock = threading.Lock()
+        self._sync_lock = threading.Lock()
+        self._task = None
+
+    def init_app(self, app):
+        self.app = app
+        self.heartbeat_interval = app.config.get('PRESENCE_HEARTBEAT_INTERVAL', self.heartbeat_interval)
+        self.timeout = app.config.get('PRESENCE_TIMEOUT', self.timeout)
+        self.sync_interval = app.config.get('PRESENCE_SYNC_INTERVAL', self.sync_interval)
+        self.shared = bool(app.config.get('SOCKETIO_MESSAGE_QUEUE'))
+        self._reconciled = False
+        app.extensions['presence'] = self
+        atexit.register(self.close)
+
+    def join(self, sid, session_id, participant_id, room, owner_id):
+        """Register a socket for a participant; True if it just came online"""
+        with self._lock:
+            self._drop(sid)
+
+            old_sid = self._by_participant.get(participant_id)
+            if old_sid is not None:
+                # Same participant on a new socket (reconnect): move it over
+                self._sids.pop(old_sid, None)
+                went_online = False
+            else:
+                self._changes[participant_id] = (session_id, True)
+                self._deltas[session_id] += 1
+                went_online = True
+
+            self._sids[sid] = _Presence(session_id, participant_id, room, owner_id)
+            self._rooms[session_id] = room
+            self._by_participant[participant_id] = sid
+
+            if self._task is None:
+                from app import socketio
+                self._task = socketio.start_background_task(self._run)
+        return went_online
+
+    def leave(self, sid):
+        """Unregister a socket; returns its entry, or None if it was unknown"""
+        with self._lock:
+            return self._drop(sid)
+
+    def _drop(self, sid):
+        entry = self._sids.pop(sid, None)
+        if entry is None:
+            return None
+        if self._by_participant.get(entry.participant_id) == sid:
+            del self._by_participant[entry.participant_id]
+            self._changes[entry.participant_id] = (entry.session_id, False)
+            self._deltas[entry.session_id] -= 1
+        return entry
+
+    def heartbeat(self, sid):
+        """Refresh a socket's liveness; False if the registry does not know it"""
+        entry = self._sids.get(sid)
+        if entry is None:
+            return False
+        entry.last_seen = time.monotonic()
+        return True
+
+    def count(self, session_id):
+        """Online participants in a session (no query once the base is known)"""
+        from app.models import Session
+
+        self.reconcile()
+        if self.shared:
+            # Other workers' deltas are invisible here; the DB is the one
+            # number every worker agrees on
+            return db.session.query(Session.online_count).filter(Session.id == session_id).scalar() or 0
+
+        base = self._counts.get(session_id)
+        if base is None:
+            base = db.session.query(Session.online_count).filter(Session.id == session_id).scalar() or 0
+            with self._lock:
+                base = self._counts.setdefault(session_id, base)
+        pending = self._deltas.get(session_id, 0) + self._inflight.get(session_id, 0)
+        return max(0, base + pending)
+
+    def forget(self, session_id):
+        """Drop a deleted session's sockets and counters without writing them"""
+        with self._lock:
+            for sid, entry in list(self._sids.items()):
+                if entry.session_id == session_id:
+                    del self._sids[sid]
+                    self._by_participant.pop(entry.participant_id, None)
+                    self._changes.pop(entry.participant_id, None)
+            self._counts.pop(session_id, None)
+            self._rooms.pop(session_id, None)
+            self._deltas.pop(session_id, None)
+            self._inflight.pop(session_id, None)
+
+    def sweep(self):
+        """Drop sockets whose heartbeat is older than PRESENCE_TIMEOUT"""
+        deadline = time.monotonic() - self.timeout
+        with self._lock:
+            stale = [sid for sid, entry in self._sids.items() if entry.last_seen < deadline]
+            return [self._drop(sid) for sid in stale]
+
+    def _run(self):
+        from app import socketio
+
+        while True:
+            socketio.sleep(self.sync_interval)
+            try:
+                self.tick()
+            except Exception as e:
+                self.app.logger.error('Presence sync error: %s', e)
+
+    def tick(self):
+        """Sweep stale sockets, persist changes, and announce new counts"""
+        from app.services.broadcast import broadcast_scheduler
+        from app.services.session_stats import stats_cache
+
+        stale = self.sweep()
+        with self.app.app_context():
+            synced = self.sync()
+
+        for entry in stale:
+            stats_cache.bump(entry.owner_id, participants=-1)
+            broadcast_scheduler.participants(entry.room, entry.session_id, left=1)
+
+        if self.shared:
+            # Counts only move once synced; announce the new totals
+            for session_id in synced:
+                room = self._rooms.get(session_id)
+                if room:
+                    broadcast_scheduler.participants(room, session_id)
+
+    def reconcile(self):
+        """Repair is_online/online_count left over from a previous run (once per process)"""
+        from app.models import Session, Participant
+
+        if self._reconciled:
+            return
+        with self._sync_lock:
+            if self._reconciled:
+                return
+            if self.shared:
+                online = db.session.query(func.count(Participant.id)).filter(
+                    Participant.session_id == Session.id, Participant.is_online.is_(True)
+                ).scalar_subquery()
+                db.session.execute(update(Session).values(online_count=online))
+            else:
+                db.session.execute(update(Participant).where(
+                    Participant.is_online.is_not(False)).values(is_online=False))
+                db.session.execute(update(Session).where(
+                    Session.online_count != 0).values(online_count=0))
+            db.session.commit()
+            with self._lock:
+                self._counts.clear()
+            self._reconciled = True
+
+    def sync(self):
+        """Write pending is_online flips and online_count changes in one commit.
+
+        Returns the ids of sessions whose online_count changed.
+        """
+        from app.models import Session, Participant
+
+        self.reconcile()
+        with self._sync_lock:
+            with self._lock:
+                changes, self._changes = self._changes, {}
+                deltas, self._deltas = self._deltas, Counter()
+                self._inflight = deltas
+            if not changes and not any(deltas.values()):
+                self._inflight = Counter()
+                return []
+
+            try:
+                flips = defaultdict(list)
+                for pid, change in changes.items():
+                    flips[change].append(pid)
+
+                # Count only rows whose flag really changed
+                applied = Counter()
+                for (session_id, state), pids in flips.items():
+                    flag = Participant.is_online.is_not(True) if state else Participant.is_online.is_(True)
+                    flipped = db.session.execute(update(Participant).where(
+                        Participant.id.in_(pids), flag).values(is_online=state)).rowcount
+                    applied[session_id] += flipped if state else -flipped
+                for session_id, delta in applied.items():
+                    if delta:
+                        db.session.execute(update(Session).where(Session.id == session_id).values(
+                            online_count=Session.online_count + delta))
+                db.session.commit()
+            except Exception:
+                db.session.rollback()
+                # Put the batch back so the next tick retries it
+                with self._lock:
+                    for pid, change in changes.items():
+                        self._changes.setdefault(pid, change)
+                    self._deltas.update(deltas)
+                    self._inflight = Counter()
+                raise
+
+            # Re-read the bases; includes whatever other workers synced and
+            # corrects local deltas for flips that turned out to be no-ops
+            rows = db.session.query(Session.id, Session.online_count).filter(
+                Session.id.in_(set(deltas) | set(applied))).all()
+            with self._lock:
+                for session_id, online_count in rows:
+                    self._counts[session_id] = online_count
+                self._inflight = Counter()
+            return [session_id for session_id, delta in applied.items() if delta]
+
+    def close(self):
+        """Mark this process's sockets offline (called at interpreter exit)"""
+        if self.app is None or not self._sids:
+            return
+        with self._lock:
+            for sid in list(self._sids):
+                self._drop(sid)
+        with self.app.app_context():
+            self.sync()
+
+
+presence = PresenceRegistry()
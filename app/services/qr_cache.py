@@ -0,0 +1,77 @@
+# app/services/qr_cache.py
+
+import hashlib
+import io
+import threading
+from collections import OrderedDict
+import qrcode
+import qrcode.image.svg
+
+QR_COLOR = '#7c3aed'
+QR_FORMATS = {'png': 'image/png', 'svg': 'image/svg+xml'}
+
+
+class _BrandedSvg(qrcode.image.svg.SvgPathImage):
+    """Single-path SVG in the same colors as the PNG"""
+    QR_PATH_STYLE = dict(qrcode.image.svg.SvgPathImage.QR_PATH_STYLE, fill=QR_COLOR)
+    background = 'white'
+
+
+def render_qr(data, fmt='png', box_size=10):
+    """Encode data as a QR image (error correction H) and return the bytes"""
+    qr = qrcode.QRCode(
+        version=1,
+        error_correction=qrcode.constants.ERROR_CORRECT_H,
+        box_size=box_size,
+        border=4
+    )
+    qr.add_data(data)
+    qr.make(fit=True)
+
+    buffered = io.BytesIO()
+    if fmt == 'svg':
+        qr.make_image(image_factory=_BrandedSvg).save(buffered)
+    else:
+        qr.make_image(fill_color=QR_COLOR, back_color="white").save(buffered, format="PNG")
+    return buffered.getvalue()
+
+
+class QRCache:
+    """Bounded LRU of rendered QR images.
+
+    Keyed by (session code, join URL, box size, format), so a different
+    host or size renders its own image. Values are (etag, bytes).
+    """
+
+    def __init__(self, maxsize=256):
+        self.maxsize = maxsize
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+    def init_app(self, app):
+        self.maxsize = app.config.get('QR_CACHE_SIZE', self.maxsize)
+
+    def get(self, code, join_url, box_size=10, fmt='png'):
+        key = (code, join_url, box_size, fmt)
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None:
+                self._entries.move_to_end(key)
+                return entry
+
+        data = render_qr(join_url, fmt, box_size)
+        entry = (hashlib.sha1(data).hexdigest(), data)
+        with self._lock:
+            self._entries[key] = entry
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.maxsize:
+                self._entries.popitem(last=False)
+        return entry
+
+    def invalidate(self, code):
+        with self._lock:
+            for key in [key for key in self._entries if key[0] == code]:
+                del self._entries[key]
+
+
+qr_cache = QRCache()
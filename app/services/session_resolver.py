@@ -0,0 +1,106 @@
+# app/services/session_resolver.py
+
+import threading
+import time
+from collections import OrderedDict, namedtuple
+from app import db
+
+SessionInfo = namedtuple('SessionInfo', [
+    'id', 'user_id', 'code', 'title', 'description',
+    'is_active', 'current_slide_index', 'total_polls', 'created_at'
+])
+
+
+class SessionResolver:
+    """Process-local LRU from session code to session metadata.
+
+    Socket events and participant routes resolve codes through here instead
+    of querying the sessions table every time. Admin routes that change
+    is_active or current_slide_index call update()/invalidate(), which only
+    reaches this process, so entries also expire after SESSION_CACHE_TTL
+    seconds. With several workers the TTL defaults to 0 and every resolve
+    reads the sessions table (one indexed row).
+    """
+
+    def __init__(self, maxsize=1024, ttl=30):
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+    def init_app(self, app):
+        self.maxsize = app.config.get('SESSION_CACHE_SIZE', self.maxsize)
+        self.ttl = app.config.get('SESSION_CACHE_TTL', self.ttl)
+
+    def _load(self, code):
+        from app.models import Session
+
+        row = db.session.query(
+            Session.id, Session.user_id, Session.code, Session.title, Session.description,
+            Session.is_active, Session.current_slide_index, Session.poll_count, Session.created_at
+        ).filter(Session.code == code).first()
+        if row is None:
+            return None
+
+        return SessionInfo(
+            id=row.id,
+            user_id=row.user_id,
+            code=row.code,
+            title=row.title,
+            description=row.description,
+            is_active=row.is_active,
+            current_slide_index=row.current_slide_index or 0,
+            total_polls=row.poll_count,
+            created_at=row.created_at
+        )
+
+    def resolve(self, code):
+        """SessionInfo for a code, or None if no such session exists"""
+        if not code:
+            return None
+
+        now = time.monotonic()
+        with self._lock:
+            entry = self._entries.get(code)
+            if entry is not None and entry[0] > now:
+                self._entries.move_to_end(code)
+                return entry[1]
+
+        info = self._load(code)
+        if info is None or self.ttl <= 0:
+            return info
+
+        with self._lock:
+            self._entries[code] = (now + self.ttl, info)
+            self._entries.move_to_end(code)
+            while len(self._entries) > self.maxsize:
+                self._entries.popitem(last=False)
+        return info
+
+    def update(self, code, **fields):
+        """Patch cached fields after a committed change"""
+        with self._lock:
+            entry = self._entries.get(code)
+            if entry is not None:
+                self._entries[code] = (entry[0], entry[1]._replace(**fields))
+
+    def invalidate(self, code):
+        with self._lock:
+            self._entries.pop(code, None)
+
+
+def session_info_dict(info):
+    """Same shape as Session.to_dict, built from cached metadata"""
+    return {
+        'id': info.id,
+        'code': info.code,
+        'title': info.title,
+        'description': info.description,
+        'is_active': info.is_active,
+        'current_slide_index': info.current_slide_index,
+        'total_polls': info.total_polls,
+        'created_at': info.created_at.isoformat()
+    }
+
+
+session_resolver = SessionResolver()
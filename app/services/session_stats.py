@@ -0,0 +1,142 @@
+# app/services/session_stats.py
+
+import threading
+import time
+from sqlalchemy import func, case
+from app import db
+
+
+def session_counts(session_ids):
+    """Online participants, votes and polls for a page of sessions.
+
+    One grouped query over the denormalized counters, restricted to
+    `session_ids`. Returns {session_id: {'participant_count', 'vote_count',
+    'poll_count'}}.
+    """
+    from app.models import Session, Poll
+
+    counts = {sid: {'participant_count': 0, 'vote_count': 0, 'poll_count': 0} for sid in session_ids}
+    if not session_ids:
+        return counts
+
+    rows = db.session.query(
+        Session.id, Session.online_count, Session.poll_count,
+        func.coalesce(func.sum(Poll.vote_count), 0)
+    ).outerjoin(Poll, Poll.session_id == Session.id).filter(
+        Session.id.in_(session_ids)
+    ).group_by(Session.id, Session.online_count, Session.poll_count)
+
+    for session_id, online, polls, votes in rows:
+        counts[session_id] = {
+            'participant_count': online,
+            'vote_count': int(votes),
+            'poll_count': polls
+        }
+    return counts
+
+
+def owner_stats(user_id=None):
+    """Totals over every session of one owner (or all sessions when None)"""
+    from app.models import Session, Poll
+
+    def owned(query):
+        return query.filter(Session.user_id == user_id) if user_id is not None else query
+
+    total, active, participants = owned(db.session.query(
+        func.count(Session.id),
+        func.coalesce(func.sum(case((Session.is_active == True, 1), else_=0)), 0),
+        func.coalesce(func.sum(Session.online_count), 0)
+    )).one()
+
+    votes = owned(db.session.query(func.coalesce(func.sum(Poll.vote_count), 0)).join(
+        Session, Session.id == Poll.session_id
+    )).scalar()
+
+    return {
+        'total': total,
+        'active': int(active),
+        'participants': int(participants),
+        'votes': int(votes)
+    }
+
+
+def session_row(sess, counts):
+    """Listing dict for a session without touching its relationships"""
+    data = {
+        'id': sess.id,
+        'user_id': sess.user_id,
+        'code': sess.code,
+        'title': sess.title,
+        'description': sess.description,
+        'is_active': sess.is_active,
+        'current_slide_index': sess.current_slide_index,
+        'total_polls': counts['poll_count'],
+        'created_at': sess.created_at.isoformat()
+    }
+    data.update(counts)
+    return data
+
+
+def dashboard_overview(user_id=None, recent=5):
+    """Owner totals plus the most recent sessions, in a fixed number of queries"""
+    from app.models import Session
+
+    query = Session.query
+    if user_id is not None:
+        query = query.filter(Session.user_id == user_id)
+    recent_sessions = query.order_by(Session.created_at.desc()).limit(recent).all()
+
+    counts = session_counts([sess.id for sess in recent_sessions])
+    return {
+        'stats': owner_stats(user_id),
+        'recent_sessions': [session_row(sess, counts[sess.id]) for sess in recent_sessions]
+    }
+
+
+class StatsCache:
+    """Per-owner dashboard statistics with a TTL and explicit invalidation.
+
+    Entries are keyed by owner id (None = every session, for admins). Routes
+    that create, toggle, end or delete a session invalidate the owner's
+    entry; votes and participant joins/leaves bump the cached counters in
+    place, so the overview costs no queries while an entry is fresh.
+    """
+
+    def __init__(self, ttl=30):
+        self.ttl = ttl
+        self._entries = {}
+        self._lock = threading.Lock()
+
+    def init_app(self, app):
+        self.ttl = app.config.get('DASHBOARD_STATS_TTL', self.ttl)
+
+    def get(self, user_id, loader):
+        """Cached value for an owner, computed with loader(user_id) on a miss"""
+        now = time.monotonic()
+        entry = self._entries.get(user_id)
+        if entry is not None and entry[0] > now:
+            return entry[1]
+
+        value = loader(user_id)
+        with self._lock:
+            self._entries[user_id] = (now + self.ttl, value)
+        return value
+
+    def invalidate(self, user_id):
+        with self._lock:
+            self._entries.pop(user_id, None)
+            self._entries.pop(None, None)
+
+    def bump(self, user_id, **deltas):
+        """Add deltas (votes=1, participants=-1, ...) to cached owner stats"""
+        with self._lock:
+            for key in (user_id, None):
+                entry = self._entries.get(key)
+                if entry is None:
+                    continue
+                stats = entry[1]['stats']
+                for name, delta in deltas.items():
+                    stats[name] = stats.get(name, 0) + delta
+
+
+stats_cache = StatsCache()
@@ -0,0 +1,281 @@
+# app/services/tally.py
+
+import threading
+import time
+from collections import Counter, OrderedDict
+from sqlalchemy import func
+from app import db
+from app.services.wordcloud import WordCloud, stopword_set
+from app.services.choices import CHOICE_TYPES, choice_counts, mask_indices
+
+
+class PollTally:
+    """Running vote counters for a single poll"""
+
+    def __init__(self, poll_id, poll_type, options, session_id=None, room=None, owner_id=None,
+                 allow_multiple=False, cloud=None):
+        self.poll_id = poll_id
+        self.session_id = session_id
+        self.owner_id = owner_id
+        self.room = room
+        self.allow_multiple = allow_multiple
+        self.poll_type = poll_type
+        self.options = list(options or [])
+        self.seeded_at = time.monotonic()
+        self.total = 0
+        # open_ended polls only keep their total; the answers themselves
+        # are paged from the votes table by Vote.id
+        self.counts = None
+
+        if poll_type in CHOICE_TYPES:
+            self.counts = [0] * len(self.options)
+        elif poll_type == 'word_cloud':
+            self.counts = cloud or WordCloud()
+
+        # Changes since the last broadcast, kept next to the counts so a
+        # drain sees both in the same state
+        self.votes = 0
+        self.last_answer = None
+        self.delta = None if self.counts is None else Counter()
+        self.resync = False
+
+    def add(self, answer, count=1):
+        """Apply one (or `count` identical) answers in O(1).
+
+        Choice polls take the vote's option bitmask and return the tuple of
+        option texts that changed; other types return the results key that
+        changed, or None if the answer did not land in any bucket.
+        """
+        self.total += count
+
+        if self.poll_type in CHOICE_TYPES:
+            keys = []
+            for index in mask_indices(answer or 0):
+                if index < len(self.counts):
+                    self.counts[index] += count
+                    keys.append(self.options[index])
+            return tuple(keys) or None
+        elif self.poll_type == 'word_cloud':
+            return self.counts.add(answer, count)
+        return None
+
+    def note(self, key, answer):
+        """Remember a recorded vote for the next broadcast"""
+        self.votes += 1
+        if self.poll_type in CHOICE_TYPES:
+            self.last_answer = ', '.join(key or ())
+        else:
+            self.last_answer = answer
+        if key is None or self.delta is None:
+            return
+        # Multi-select choice votes change several options at once
+        for k in (key if isinstance(key, tuple) else (key,)):
+            self.delta[k] += 1
+
+    def drain(self, full=False):
+        """Votes noted since the previous drain, with the results they led to"""
+        drained = {
+            'room': self.room,
+            'votes': self.votes,
+            'answer': self.last_answer,
+            'total_votes': self.total,
+            'results': self.results() if full or self.resync else None,
+            'delta': self.delta,
+            'resync': self.resync
+        }
+        self.votes = 0
+        self.delta = None if self.delta is None else Counter()
+        self.resync = False
+        return drained
+
+    def results(self):
+        """Snapshot in the same shape Poll.get_results always returned (None for open_ended)"""
+        if self.counts is None:
+            return None
+        if self.poll_type == 'word_cloud':
+            return self.counts.results()
+        return dict(zip(self.options, self.counts))
+
+
+class TallyEngine:
+    """Process-local vote tallies, seeded from the database once per poll.
+
+    The votes table is only read the first time a poll is seen (or after
+    reconcile()), so a restart simply re-seeds lazily from what was
+    committed. Callers must call ensure() *before* writing a vote and
+    record() *after* committing it, otherwise the seed could count the
+    same vote twice.
+
+    With several workers (SOCKETIO_MESSAGE_QUEUE) each process only sees
+    its own votes, so tallies are re-seeded once they are older than
+    TALLY_MAX_AGE seconds; between re-seeds a worker's counts may lag.
+
+    Seeds are read outside the engine lock (one seed at a time per poll),
+    and at most TALLY_CACHE_SIZE tallies are kept; the least recently used
+    ones are dropped and simply re-seeded if their poll comes back.
+    """
+
+    SEED_LOCKS = 64
+
+    def __init__(self):
+        self.max_age = 0
+        self.max_size = 1000
+        self.cloud_top_k = 50
+        self.cloud_capacity = 200
+        self.stopwords = frozenset()
+        self._tallies = OrderedDict()
+        self._lock = threading.Lock()
+        self._seed_locks = [threading.Lock() for _ in range(self.SEED_LOCKS)]
+
+    def init_app(self, app):
+        self.max_age = app.config.get('TALLY_MAX_AGE', 0)
+        self.max_size = max(1, app.config.get('TALLY_CACHE_SIZE', self.max_size))
+        self.cloud_top_k = app.config.get('WORD_CLOUD_TOP_K', self.cloud_top_k)
+        self.cloud_capacity = max(self.cloud_top_k, app.config.get('WORD_CLOUD_CAPACITY', self.cloud_capacity))
+        self.stopwords = stopword_set(app.config.get('WORD_CLOUD_STOPWORDS'))
+        app.extensions['tally_engine'] = self
+
+    def _fresh(self, tally):
+        return tally is not None and (
+            not self.max_age or time.monotonic() - tally.seeded_at < self.max_age
+        )
+
+    def _load(self, poll):
+        from app.models import Vote
+
+        tally = PollTally(poll.id, poll.poll_type, poll.options,
+                          session_id=poll.session_id, room=poll.session.code,
+                          owner_id=poll.session.user_id,
+                          allow_multiple=bool(poll.allow_multiple),
+                          cloud=WordCloud(self.cloud_top_k, self.cloud_capacity, self.stopwords))
+
+        if tally.poll_type in CHOICE_TYPES:
+            # One row per distinct selection, expanded to option counts in numpy.
+            # Rows from before choice_mask existed still carry the option text.
+            rows = db.session.query(Vote.choice_mask, Vote.answer, func.count(Vote.id)).filter(
+                Vote.poll_id == poll.id
+            ).group_by(Vote.choice_mask, Vote.answer).all()
+            masks, weights = [], []
+            for mask, answer, count in rows:
+                if mask is None and answer in tally.options:
+                    mask = 1 << tally.options.index(answer)
+                tally.total += count
+                if mask:
+                    masks.append(mask)
+                    weights.append(count)
+            tally.counts = choice_counts(len(tally.options), masks, weights).tolist()
+        elif tally.counts is None:
+            tally.total = db.session.query(func.count(Vote.id)).filter(
+                Vote.poll_id == poll.id
+            ).scalar() or 0
+        else:
+            rows = db.session.query(Vote.answer, func.count(Vote.id)).filter(
+                Vote.poll_id == poll.id
+            ).group_by(Vote.answer).all()
+            for answer, count in rows:
+                tally.add(answer, count)
+
+        return tally
+
+    def ensure(self, poll):
+        """Return the tally for a poll, seeding it from the DB if needed"""
+        tally = self._tallies.get(poll.id)
+        if self._fresh(tally):
+            return tally
+
+        with self._seed_lock(poll.id):
+            tally = self._tallies.get(poll.id)
+            if self._fresh(tally):
+                return tally
+            return self._reseed(poll)
+
+    def _seed_lock(self, poll_id):
+        # Striped so concurrent seeds of one poll wait for a single query
+        # without blocking record() or other polls
+        return self._seed_locks[hash(poll_id) % self.SEED_LOCKS]
+
+    def _reseed(self, poll):
+        # Caller holds the poll's seed lock; the query runs without self._lock
+        tally = self._load(poll)
+        with self._lock:
+            stale = self._tallies.get(poll.id)
+            if stale is not None and (stale.votes or stale.resync):
+                # Undrained votes are already in the new seed; the next
+                # broadcast sends full results instead of their delta
+                tally.votes, tally.last_answer = stale.votes, stale.last_answer
+                tally.resync = True
+            self._tallies[poll.id] = tally
+            self._tallies.move_to_end(poll.id)
+            self._evict()
+        return tally
+
+    def _evict(self):
+        # Caller holds self._lock. Tallies with votes still to broadcast
+        # stay until they have been drained
+        excess = len(self._tallies) - self.max_size
+        if excess <= 0:
+            return
+        idle = [poll_id for poll_id, tally in self._tallies.items() if not tally.votes and not tally.resync]
+        for poll_id in idle[:excess]:
+            del self._tallies[poll_id]
+
+    def lookup(self, poll_id):
+        """Tally for a poll id, or None if the poll does not exist.
+
+        Only the first call per poll touches the database (poll + session
+        in one query), so the vote path can resolve its room for free.
+        """
+        from sqlalchemy.orm import joinedload
+        from app.models import Poll
+
+        tally = self._tallies.get(poll_id)
+        if self._fresh(tally):
+            return tally
+
+        poll = db.session.get(Poll, poll_id, options=[joinedload(Poll.session)])
+        if poll is None:
+            return None
+        return self.ensure(poll)
+
+    def record(self, poll, answer):
+        """Count a freshly committed vote, returning the key that changed"""
+        tally = poll if isinstance(poll, PollTally) else self.ensure(poll)
+        with self._lock:
+            if self._tallies.get(tally.poll_id) is tally:
+                self._tallies.move_to_end(tally.poll_id)
+            key = tally.add(answer)
+            tally.note(key, answer)
+            return key
+
+    def results(self, poll):
+        tally = self.ensure(poll)
+        with self._lock:
+            return tally.results()
+
+    def drain(self, poll_id, full=False):
+        """Take a seeded poll's pending delta together with its total (and results if full).
+
+        Both are read under the lock record() uses, so a vote is either in
+        this delta and the snapshot or in neither. Returns None when nothing
+        was recorded since the previous drain. Results are also included
+        after a re-seed; open_ended polls never have any (their answers are
+        paged from the votes table).
+        """
+        with self._lock:
+            tally = self._tallies.get(poll_id)
+            if tally is None or not tally.votes:
+                return None
+            return tally.drain(full)
+
+    def reconcile(self, poll):
+        """Re-seed a poll's tally from committed votes (undrained votes are kept)"""
+        with self._seed_lock(poll.id):
+            return self._reseed(poll)
+
+    def forget(self, *poll_ids):
+        with self._lock:
+            for poll_id in poll_ids:
+                self._tallies.pop(poll_id, None)
+
+
+tally_engine = TallyEngine()
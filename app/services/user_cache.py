@@ -0,0 +1,68 @@
+# app/services/user_cache.py
+
+import threading
+import time
+from collections import OrderedDict
+from sqlalchemy.orm import make_transient_to_detached
+from app import db
+
+
+class UserCache:
+    """Process-local TTL cache behind Flask-Login's user_loader.
+
+    Stores each user's column values, not the ORM object (instances belong
+    to the request's db.session). On a hit the User is rebuilt from those
+    values and attached to the current session with merge(load=False), so
+    no SELECT is issued, yet relationships and attribute writes still work
+    as usual. users_management add/edit/delete, login and the session
+    counter call invalidate(); entries also expire after USER_CACHE_TTL
+    seconds so other processes see deactivations.
+    """
+
+    def __init__(self, maxsize=1024, ttl=60):
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+    def init_app(self, app):
+        self.maxsize = app.config.get('USER_CACHE_SIZE', self.maxsize)
+        self.ttl = app.config.get('USER_CACHE_TTL', self.ttl)
+
+    def _columns(self, user):
+        return {attr.key: getattr(user, attr.key) for attr in db.inspect(type(user)).column_attrs}
+
+    def get(self, user_id):
+        """User for an id (attached to db.session), or None"""
+        from app.models import User
+
+        now = time.monotonic()
+        with self._lock:
+            entry = self._entries.get(user_id)
+            if entry is not None and entry[0] > now:
+                self._entries.move_to_end(user_id)
+                columns = entry[1]
+            else:
+                columns = None
+
+        if columns is None:
+            user = db.session.get(User, user_id)
+            if user is None:
+                return None
+            with self._lock:
+                self._entries[user_id] = (now + self.ttl, self._columns(user))
+                self._entries.move_to_end(user_id)
+                while len(self._entries) > self.maxsize:
+                    self._entries.popitem(last=False)
+            return user
+
+        user = User(**columns)
+        make_transient_to_detached(user)
+        return db.session.merge(user, load=False)
+
+    def invalidate(self, user_id):
+        with self._lock:
+            self._entries.pop(user_id, None)
+
+
+user_cache = UserCache()
@@ -0,0 +1,210 @@
+# app/services/vote_buffer.py
+
+import atexit
+import threading
+import time
+from datetime import datetime
+from sqlalchemy.exc import DataError, IntegrityError
+
+
+class _Batch:
+    """Votes that will be written by the same bulk INSERT"""
+
+    def __init__(self, rows=None, attempts=0):
+        self.rows = rows if rows is not None else []
+        self.attempts = attempts
+        self.done = threading.Event()
+        self.error = None
+        # (poll_id, participant_id) of rows the database refused
+        self.rejected = set()
+        # Set when a failed batch is queued again; waiters follow it
+        self.retry = None
+
+
+class VoteBuffer:
+    """Optional write-behind buffer for votes.
+
+    With VOTE_WRITE_MODE = 'write_behind', accepted votes are appended to an
+    in-process batch and written with one executemany INSERT once the batch
+    reaches VOTE_FLUSH_BATCH_SIZE rows or VOTE_FLUSH_INTERVAL seconds have
+    passed, whichever comes first. VOTE_DURABILITY = 'strict' makes the
+    caller wait for its batch to be committed before acknowledging; the
+    default 'buffered' acknowledges as soon as the vote is queued. Rows that
+    collide with _poll_participant_uc are skipped by the INSERT itself.
+    Votes are only counted and broadcast once their batch is committed, and
+    only the rows the INSERT actually wrote. A batch the database refuses
+    (constraint or data error) is split in halves until the offending rows
+    are isolated, so only those are dropped; any other failure queues the
+    batch again up to VOTE_FLUSH_RETRIES times before its rows are dropped.
+    Whatever is still buffered is flushed when the process exits.
+    """
+
+    def __init__(self):
+        self.app = None
+        self.enabled = False
+        self.strict = False
+        self.batch_size = 200
+        self.interval = 0.5
+        self.timeout = 5.0
+        self.retries = 3
+        self._batch = _Batch()
+        self._retries = []
+        self._keys = set()
+        self._lock = threading.Lock()
+        self._flush_lock = threading.Lock()
+        self._task = None
+
+    def init_app(self, app):
+        self.app = app
+        self.enabled = app.config.get('VOTE_WRITE_MODE', 'sync') == 'write_behind'
+        self.strict = app.config.get('VOTE_DURABILITY', 'buffered') == 'strict'
+        self.batch_size = max(1, app.config.get('VOTE_FLUSH_BATCH_SIZE', self.batch_size))
+        self.interval = app.config.get('VOTE_FLUSH_INTERVAL', self.interval)
+        self.timeout = app.config.get('VOTE_FLUSH_TIMEOUT', self.timeout)
+        self.retries = app.config.get('VOTE_FLUSH_RETRIES', self.retries)
+        app.extensions['vote_buffer'] = self
+
+        if self.enabled:
+            atexit.register(self.close)
+
+    def submit(self, poll_id, participant_id, answer, choice_mask=None):
+        """Queue a vote; returns its batch, or None if it is already queued"""
+        key = (poll_id, participant_id)
+        with self._lock:
+            if key in self._keys:
+                return None
+            self._keys.add(key)
+
+            batch = self._batch
+            batch.rows.append({
+                'poll_id': poll_id,
+                'participant_id': participant_id,
+                'answer': answer,
+                'choice_mask': choice_mask,
+                'voted_at': datetime.utcnow()
+            })
+            full = len(batch.rows) >= self.batch_size
+
+            if self._task is None:
+                from app import socketio
+                self._task = socketio.start_background_task(self._run)
+
+        # Size threshold: whoever fills the batch writes it
+        if full:
+            self.flush()
+        return batch
+
+    def wait(self, batch, poll_id=None, participant_id=None):
+        """Block until a batch is committed; returns False on timeout or error.
+
+        With a poll and participant, also False if that vote's row was refused.
+        """
+        deadline = time.monotonic() + self.timeout
+        while batch.done.wait(max(0, deadline - time.monotonic())):
+            if batch.retry is None:
+                return batch.error is None and (poll_id, participant_id) not in batch.rejected
+            batch = batch.retry
+        return False
+
+    def _run(self):
+        from app import socketio
+
+        while True:
+            socketio.sleep(self.interval)
+            self.flush()
+
+    def flush(self):
+        """Write the current batch (and any queued retries), one bulk INSERT each"""
+        with self._flush_lock:
+            with self._lock:
+                batches, self._retries = self._retries, []
+                batches.append(self._batch)
+                self._batch = _Batch()
+
+            written = 0
+            for batch in batches:
+                written += self._flush_batch(batch)
+            return written
+
+    def _flush_batch(self, batch):
+        if not batch.rows:
+            batch.done.set()
+            return 0
+
+        try:
+            written = self._write_split(batch, batch.rows)
+        except Exception as e:
+            from app.services.tally import tally_engine
+
+            # The commit may or may not have happened; re-seed from the DB
+            tally_engine.forget(*{row['poll_id'] for row in batch.rows})
+            batch.error = e
+            if batch.attempts + 1 < self.retries:
+                self.app.logger.warning('Vote flush error (attempt %d), retrying %d vote(s): %s',
+                                        batch.attempts + 1, len(batch.rows), e)
+                # Rows already refused stay refused; the rest is tried again
+                batch.retry = _Batch([row for row in batch.rows
+                                      if (row['poll_id'], row['participant_id']) not in batch.rejected],
+                                     batch.attempts + 1)
+                batch.retry.rejected = batch.rejected
+                with self._lock:
+                    self._retries.append(batch.retry)
+                batch.done.set()
+                return 0
+            self.app.logger.error('Vote flush failed, dropping %d vote(s): %s', len(batch.rows), e)
+            written = 0
+
+        with self._lock:
+            for row in batch.rows:
+                self._keys.discard((row['poll_id'], row['participant_id']))
+        batch.done.set()
+        return written
+
+    def _write_split(self, batch, rows):
+        """Write rows, bisecting around rows the database refuses"""
+        from app.services.votes import idempotency_keys
+
+        try:
+            with self.app.app_context():
+                return self._write(rows)
+        except (IntegrityError, DataError) as e:
+            if len(rows) == 1:
+                row = rows[0]
+                self.app.logger.error('Dropping vote of participant %r on poll %r: %s',
+                                      row['participant_id'], row['poll_id'], e)
+                key = (row['poll_id'], row['participant_id'])
+                batch.rejected.add(key)
+                with self._lock:
+                    self._keys.discard(key)
+                # Let the participant vote again instead of being told it is a retry
+                idempotency_keys.forget(*key)
+                return 0
+            middle = len(rows) // 2
+            return self._write_split(batch, rows[:middle]) + self._write_split(batch, rows[middle:])
+
+    def _write(self, rows):
+        from app.services.votes import insert_votes, publish_vote
+        from app.services.tally import tally_engine
+
+        # Tallies are seeded before the INSERT so the seed can't count these rows
+        tallies = {poll_id: tally_engine.lookup(poll_id) for poll_id in {row['poll_id'] for row in rows}}
+
+        written = insert_votes(rows)
+        if written is None:
+            # Some rows were skipped and we can't tell which; re-seed
+            tally_engine.forget(*tallies)
+            return len(rows)
+
+        for row in written:
+            tally = tallies.get(row['poll_id'])
+            if tally is not None:
+                publish_vote(tally, row['choice_mask'] if row['choice_mask'] is not None else row['answer'])
+        return len(written)
+
+    def close(self):
+        """Flush whatever is still buffered (called at interpreter exit)"""
+        if self.enabled:
+            self.flush()
+
+
+vote_buffer = VoteBuffer()
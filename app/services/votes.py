@@ -0,0 +1,165 @@
+# app/services/votes.py
+
+import threading
+from collections import Counter, OrderedDict
+from sqlalchemy import insert
+from sqlalchemy.exc import IntegrityError
+from app import db
+
+
+def vote_insert_ignore():
+    """INSERT for Vote that silently skips rows hitting _poll_participant_uc"""
+    from app.models import Vote
+
+    dialect = db.session.get_bind().dialect.name
+
+    if dialect == 'sqlite':
+        from sqlalchemy.dialects.sqlite import insert as sqlite_insert
+        return sqlite_insert(Vote).on_conflict_do_nothing(
+            index_elements=['poll_id', 'participant_id']
+        )
+    if dialect in ('mysql', 'mariadb'):
+        return insert(Vote).prefix_with('IGNORE')
+    if dialect == 'postgresql':
+        from sqlalchemy.dialects.postgresql import insert as pg_insert
+        return pg_insert(Vote).on_conflict_do_nothing(constraint='_poll_participant_uc')
+    return None
+
+
+def insert_votes(rows):
+    """Insert vote rows in one statement; returns the rows that were new.
+
+    Poll.vote_count is updated in the same transaction. Where the dialect
+    can't report which rows of a multi-row INSERT were skipped, None is
+    returned if some were.
+    """
+    from app.models import Vote
+    from app.services.counters import bump_poll_votes, recount_poll_votes
+
+    stmt = vote_insert_ignore()
+    if stmt is None:
+        # Unknown dialect: plain INSERT, a duplicate fails the whole call
+        try:
+            db.session.execute(insert(Vote), rows)
+            written = rows
+        except IntegrityError:
+            db.session.rollback()
+            return []
+    elif len(rows) > 1 and db.session.get_bind().dialect.insert_executemany_returning:
+        # Let the database tell us which rows it actually wrote
+        result = db.session.connection().execute(
+            stmt.returning(Vote.poll_id, Vote.participant_id), rows)
+        keys = {tuple(key) for key in result}
+        written = [row for row in rows if (row['poll_id'], row['participant_id']) in keys]
+    else:
+        # Core execution (not ORM bulk) so rowcount reports skipped duplicates
+        count = db.session.connection().execute(stmt, rows).rowcount
+        written = rows if count == len(rows) else [] if count == 0 else None
+
+    if written is None:
+        # Some rows were skipped; we can't tell which, so recount those polls
+        recount_poll_votes({row['poll_id'] for row in rows})
+    else:
+        for poll_id, count in Counter(row['poll_id'] for row in written).items():
+            bump_poll_votes(poll_id, count)
+
+    db.session.commit()
+    return written
+
+
+def has_voted(poll_id, participant_id):
+    """Whether a committed vote exists for this poll and participant"""
+    from app.models import Vote
+
+    return db.session.query(db.exists().where(
+        Vote.poll_id == poll_id, Vote.participant_id == participant_id
+    )).scalar()
+
+
+def participant_in_session(participant_id, session_id):
+    """Whether a participant exists and belongs to the given session"""
+    from app.models import Participant
+
+    return db.session.query(db.exists().where(
+        Participant.id == participant_id, Participant.session_id == session_id
+    )).scalar()
+
+
+def clean_text_answer(answer, max_length):
+    """A text answer without surrounding whitespace; ValueError if it is not usable"""
+    if not isinstance(answer, str) or not answer.strip():
+        raise ValueError('Answer is required')
+    answer = answer.strip()
+    if len(answer) > max_length:
+        raise ValueError(f'Answer is too long (max {max_length} characters)')
+    return answer
+
+
+def publish_vote(tally, value):
+    """Count a committed vote in its tally, the dashboard stats and the next broadcast.
+
+    `value` is the vote's option bitmask for choice polls, its answer otherwise.
+    """
+    from app.services.tally import tally_engine
+    from app.services.broadcast import broadcast_scheduler
+    from app.services.session_stats import stats_cache
+
+    tally_engine.record(tally, value)
+    stats_cache.bump(tally.owner_id, votes=1)
+    # Coalesced into one new_vote per tick
+    broadcast_scheduler.vote(tally)
+
+
+def answer_page(poll_id, after=0, limit=100):
+    """open_ended answers with Vote.id > after, oldest first.
+
+    Returns (answers, cursor, has_more); the cursor is the last Vote.id
+    returned, so it stays valid across workers, restarts and re-seeds.
+    """
+    from app.models import Vote
+
+    rows = db.session.query(Vote.id, Vote.answer).filter(
+        Vote.poll_id == poll_id, Vote.id > after
+    ).order_by(Vote.id).limit(limit + 1).all()
+    has_more = len(rows) > limit
+    rows = rows[:limit]
+    cursor = rows[-1][0] if rows else after
+    return [answer for _, answer in rows], cursor, has_more
+
+
+class IdempotencyCache:
+    """Bounded LRU of the idempotency key each accepted vote was sent with.
+
+    Keys are scoped to their (poll_id, participant_id), so a key only ever
+    matches a retry of that participant's vote on that poll.
+    """
+
+    def __init__(self, maxsize=10000):
+        self.maxsize = maxsize
+        self._keys = OrderedDict()
+        self._lock = threading.Lock()
+
+    def init_app(self, app):
+        self.maxsize = app.config.get('VOTE_IDEMPOTENCY_CACHE_SIZE', self.maxsize)
+
+    def accepted(self, poll_id, participant_id, key):
+        """Whether this participant's vote on this poll was accepted with `key`"""
+        with self._lock:
+            if self._keys.get((poll_id, participant_id)) != key:
+                return False
+            self._keys.move_to_end((poll_id, participant_id))
+            return True
+
+    def remember(self, poll_id, participant_id, key):
+        with self._lock:
+            self._keys[(poll_id, participant_id)] = key
+            self._keys.move_to_end((poll_id, participant_id))
+            while len(self._keys) > self.maxsize:
+                self._keys.popitem(last=False)
+
+    def forget(self, poll_id, participant_id):
+        with self._lock:
+            self._keys.pop((poll_id, participant_id), None)
+
+
+idempotency_keys = IdempotencyCache()
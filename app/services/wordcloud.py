@@ -0,0 +1,134 @@
+# app/services/wordcloud.py
+
+import heapq
+import unicodedata
+
+# Small built-in lists; WORD_CLOUD_STOPWORDS picks which ones apply
+STOPWORDS = {
+    'id': frozenset('''
+        ada adalah agar akan aku anda apa atau bagi bahwa banyak begitu belum
+        bisa buat dalam dan dari dengan di dia ini itu jadi jika juga kalau
+        kami kamu karena ke kita lagi lebih masih mereka nya oleh pada para
+        saja sangat saya sebagai sedang sudah supaya tapi telah tentang tidak
+        untuk walau yang
+    '''.split()),
+    'en': frozenset('''
+        a about an and are as at be been but by can do for from has have i
+        if in into is it its my no not of on or our so that the their them
+        there they this to too us was we were what when which who will with
+        you your
+    '''.split()),
+}
+
+
+def stopword_set(languages):
+    """Union of the built-in lists named in 'id,en' style config"""
+    words = set()
+    for lang in (languages or '').replace(' ', '').split(','):
+        words |= STOPWORDS.get(lang.lower(), frozenset())
+    return frozenset(words)
+
+
+def normalize_term(text, stopwords=frozenset()):
+    """Canonical form of a word-cloud answer, or None if nothing is left.
+
+    NFKC folds compatibility characters (full-width letters, ligatures),
+    casefold() lower-cases beyond ASCII, and punctuation is dropped so that
+    'AI', 'ai ' and 'A.I.' all count as 'ai'.
+    """
+    if not text:
+        return None
+
+    chars = []
+    for ch in unicodedata.normalize('NFKC', text).casefold():
+        category = unicodedata.category(ch)[0]
+        if category == 'P':
+            # Dots and apostrophes join (a.i. -> ai), other punctuation splits
+            chars.append('' if ch in ".'\u2019" else ' ')
+        elif category in 'ZC':
+            chars.append(' ')
+        else:
+            chars.append(ch)
+
+    words = [word for word in ''.join(chars).split() if word not in stopwords]
+    return ' '.join(words) or None
+
+
+class SpaceSaving:
+    """Space-Saving heavy hitters (Metwally et al.) over at most `capacity` terms.
+
+    Terms are grouped in buckets by count so that a unit increment moves a
+    term one bucket up and a new term evicts from the lowest bucket, both in
+    O(1). Counts may overestimate by at most the evicted minimum, which is
+    kept per term in `errors`.
+    """
+
+    def __init__(self, capacity=200):
+        self.capacity = max(1, capacity)
+        self.counts = {}
+        self.errors = {}
+        self._buckets = {}
+        self._min = 0
+
+    def __len__(self):
+        return len(self.counts)
+
+    def _place(self, term, count):
+        self.counts[term] = count
+        self._buckets.setdefault(count, {})[term] = None
+
+    def _unplace(self, term):
+        count = self.counts.pop(term)
+        bucket = self._buckets[count]
+        del bucket[term]
+        if not bucket:
+            del self._buckets[count]
+        return count
+
+    def add(self, term, count=1):
+        if term in self.counts:
+            old = self._unplace(term)
+            self._place(term, old + count)
+            if old == self._min and old not in self._buckets:
+                # Unit steps land in the next bucket; weighted ones rescan
+                self._min = old + 1 if count == 1 else min(self._buckets)
+            return term
+
+        if len(self.counts) < self.capacity:
+            self.errors[term] = 0
+            self._place(term, count)
+            self._min = count if len(self.counts) == 1 else min(self._min, count)
+            return term
+
+        # Full: the term takes over the slot of a minimum-count one
+        victim = next(iter(self._buckets[self._min]))
+        floor = self._unplace(victim)
+        del self.errors[victim]
+        self.errors[term] = floor
+        self._place(term, floor + count)
+        if floor not in self._buckets:
+            self._min = floor + 1 if count == 1 else min(self._buckets)
+        return term
+
+    def top(self, k):
+        """The k most frequent terms as {term: count}"""
+        return dict(heapq.nlargest(k, self.counts.items(), key=lambda item: item[1]))
+
+
+class WordCloud:
+    """Incremental word-cloud tally: normalize, drop stopwords, keep the top K"""
+
+    def __init__(self, top_k=50, capacity=None, stopwords=frozenset()):
+        self.top_k = top_k
+        self.stopwords = stopwords
+        self.terms = SpaceSaving(capacity or top_k * 4)
+
+    def add(self, answer, count=1):
+        """Count an answer; returns its normalized term or None if empty"""
+        term = normalize_term(answer, self.stopwords)
+        if term is None:
+            return None
+        return self.terms.add(term, count)
+
+    def results(self):
+        return self.terms.top(self.top_k)
@@ -1,7 +1,18 @@
+from flask import request
 from flask_socketio import emit, join_room, leave_room
-from app import socketio, db
-from app.models import Session, Participant, Poll
-import secrets
+from flask_login import current_user
+from app import socketio
+from app.services.session_stats import stats_cache
+from app.services.session_resolver import session_resolver
+from app.services.presence import presence
+from app.services.join_buffer import join_buffer
+from app.services.broadcast import broadcast_scheduler
+from app.sockets.rooms import presenter_room, audience_room
+
+def participant_gone(entry):
+    """Count a participant that went offline (leave, disconnect)"""
+    stats_cache.bump(entry.owner_id, participants=-1)
+    broadcast_scheduler.participants(entry.room, entry.session_id, left=1)
 
 @socketio.on('connect')
 def handle_connect():
@@ -11,70 +22,56 @@ def handle_connect():
 @socketio.on('disconnect')
 def handle_disconnect():
     print('Client disconnected')
+    join_buffer.cancel(request.sid)
+    entry = presence.leave(request.sid)
+    if entry:
+        participant_gone(entry)
+
+@socketio.on('heartbeat')
+def handle_heartbeat(data=None):
+    """Participant liveness ping; online=False tells the client to rejoin"""
+    return {'online': presence.heartbeat(request.sid)}
 
 @socketio.on('join_session')
 def handle_join_session(data):
     """Participant joins a session room"""
     session_code = data.get('session_code')
     
-    poll_session = Session.query.filter_by(code=session_code).first()
+    poll_session = session_resolver.resolve(session_code)
     if not poll_session:
         emit('error', {'message': 'Invalid session'})
         return
     
-    # Create participant
-    participant_id = secrets.token_hex(8)
-    participant = Participant(
-        session_id=poll_session.id,
-        identifier=participant_id
-    )
-    db.session.add(participant)
-    db.session.commit()
-    
-    # Join room
-    join_room(session_code)
-    
-    # Send current poll
-    current_poll = Poll.query.filter_by(
-        session_id=poll_session.id,
-        slide_number=poll_session.current_slide_index + 1
-    ).first()
-    
-    emit('session_joined', {
-        'participant_id': participant.id,
-        'participant_identifier': participant_id,
-        'current_slide': poll_session.current_slide_index,
-        'total_slides': len(poll_session.polls),
-        'current_poll': current_poll.to_dict() if current_poll else None
-    })
-    
-    # Notify admin of new participant
-    emit('participant_joined', {
-        'count': Participant.query.filter_by(session_id=poll_session.id, is_online=True).count()
-    }, room=session_code)
+    # Join room now; the participant row and session_joined come with the
+    # next batched flush. Reconnecting clients send their identifier back
+    # and keep their votes.
+    join_room(audience_room(session_code))
+    join_buffer.submit(request.sid, session_code, data.get('participant_identifier'))
 
 @socketio.on('admin_join')
 def handle_admin_join(data):
-    """Admin joins session room for monitoring"""
+    """Session owner (or an admin) joins the presenter room for monitoring"""
     session_code = data.get('session_code')
-    join_room(session_code)
+    
+    poll_session = session_resolver.resolve(session_code)
+    if not poll_session:
+        emit('error', {'message': 'Invalid session'})
+        return
+    if not current_user.is_authenticated or (
+            poll_session.user_id != current_user.id and not current_user.is_admin):
+        emit('error', {'message': 'Unauthorized'})
+        return
+    
+    join_room(presenter_room(session_code))
     emit('admin_connected', {'message': 'Monitoring session'})
 
 @socketio.on('leave_session')
 def handle_leave_session(data):
     """Participant leaves session"""
     session_code = data.get('session_code')
-    participant_id = data.get('participant_id')
-    
-    participant = Participant.query.get(participant_id)
-    if participant:
-        participant.is_online = False
-        db.session.commit()
     
-    leave_room(session_code)
+    entry = presence.leave(request.sid)
+    leave_room(audience_room(session_code))
     
-    poll_session = Session.query.filter_by(code=session_code).first()
-    if poll_session:
-        emit('participant_left', {
-            'count': Participant.query.filter_by(session_id=poll_session.id, is_online=True).count()
-        }, room=session_code)
+    if entry:
+        participant_gone(entry)
@@ -0,0 +1,21 @@
+# app/sockets/rooms.py
+
+from app import socketio
+
+# Each session has two rooms: dashboards monitoring it (presenters) and
+# participant phones (audience). Heavy payloads such as new_vote only go
+# to presenters.
+
+
+def presenter_room(code):
+    return f'{code}:presenter'
+
+
+def audience_room(code):
+    return code
+
+
+def emit_session(event, data, code):
+    """Session-wide event (slide change, pause, end) for both rooms"""
+    socketio.emit(event, data, room=presenter_room(code))
+    socketio.emit(event, data, room=audience_room(code))
@@ -10,5 +10,108 @@ class Config:
     SQLALCHEMY_DATABASE_URI = os.environ.get('DATABASE_URL') or 'sqlite:///polling.db'
     SQLALCHEMY_TRACK_MODIFICATIONS = False
     PERMANENT_SESSION_LIFETIME = timedelta(hours=24)
-    SOCKETIO_ASYNC_MODE = 'eventlet'
-    SOCKETIO_CORS_ALLOWED_ORIGINS = "*"
+    # 'eventlet' (green threads; the process must be monkey-patched first,
+    # as run.py does), 'threading', or unset to pick eventlet only when the
+    # stdlib is already patched (e.g. gunicorn -k eventlet)
+    SOCKETIO_ASYNC_MODE = os.environ.get('SOCKETIO_ASYNC_MODE') or None
+    SOCKETIO_CORS_ALLOWED_ORIGINS = os.environ.get('SOCKETIO_CORS_ALLOWED_ORIGINS', "*")
+    # Multi-worker Socket.IO: redis://..., amqp://... or, on a single box
+    # without a broker, filesystem:///path/to/spool. Unset = single process.
+    # Several process-local caches below default to reading the DB when set.
+    SOCKETIO_MESSAGE_QUEUE = os.environ.get('SOCKETIO_MESSAGE_QUEUE')
+    SOCKETIO_CHANNEL = os.environ.get('SOCKETIO_CHANNEL', 'brtanya')
+    
+    # Password hashing: bcrypt cost, hashes running at once, and how many more
+    # may queue before login answers 503 (hashes are upgraded on login when
+    # BCRYPT_ROUNDS changes)
+    BCRYPT_ROUNDS = int(os.environ.get('BCRYPT_ROUNDS', 12))
+    BCRYPT_WORKERS = int(os.environ.get('BCRYPT_WORKERS', 2))
+    BCRYPT_QUEUE_LIMIT = int(os.environ.get('BCRYPT_QUEUE_LIMIT', 16))
+    
+    # Connection pool (ignored for SQLite). Green threads share few
+    # connections, so the pool bounds concurrent DB work, not sockets.
+    DB_POOL_SIZE = int(os.environ.get('DB_POOL_SIZE', 20))
+    DB_MAX_OVERFLOW = int(os.environ.get('DB_MAX_OVERFLOW', 10))
+    DB_POOL_TIMEOUT = int(os.environ.get('DB_POOL_TIMEOUT', 10))
+    DB_POOL_RECYCLE = int(os.environ.get('DB_POOL_RECYCLE', 280))
+    
+    # Real-time vote broadcasting: one coalesced new_vote per poll per tick,
+    # with a full results snapshot every N ticks
+    VOTE_BROADCAST_INTERVAL = float(os.environ.get('VOTE_BROADCAST_INTERVAL', 0.15))
+    VOTE_BROADCAST_SNAPSHOT_EVERY = int(os.environ.get('VOTE_BROADCAST_SNAPSHOT_EVERY', 20))
+    
+    # Word clouds: terms tracked per poll (Space-Saving), terms sent to
+    # clients, and stopword lists to drop ('id', 'en', 'id,en' or empty)
+    WORD_CLOUD_CAPACITY = int(os.environ.get('WORD_CLOUD_CAPACITY', 200))
+    WORD_CLOUD_TOP_K = int(os.environ.get('WORD_CLOUD_TOP_K', 50))
+    WORD_CLOUD_STOPWORDS = os.environ.get('WORD_CLOUD_STOPWORDS', '')
+    # Longest text answer (word_cloud, open_ended) /api/vote accepts
+    VOTE_ANSWER_MAX_LENGTH = int(os.environ.get('VOTE_ANSWER_MAX_LENGTH', 500))
+    
+    # Vote persistence: 'sync' commits every vote, 'write_behind' buffers
+    # votes and bulk-inserts them. VOTE_DURABILITY='strict' makes /api/vote
+    # wait until the vote's batch is committed. A failing batch is attempted
+    # up to VOTE_FLUSH_RETRIES times before its votes are dropped.
+    VOTE_WRITE_MODE = os.environ.get('VOTE_WRITE_MODE', 'sync')
+    VOTE_DURABILITY = os.environ.get('VOTE_DURABILITY', 'buffered')
+    VOTE_FLUSH_BATCH_SIZE = int(os.environ.get('VOTE_FLUSH_BATCH_SIZE', 200))
+    VOTE_FLUSH_INTERVAL = float(os.environ.get('VOTE_FLUSH_INTERVAL', 0.5))
+    VOTE_FLUSH_TIMEOUT = float(os.environ.get('VOTE_FLUSH_TIMEOUT', 5))
+    VOTE_FLUSH_RETRIES = int(os.environ.get('VOTE_FLUSH_RETRIES', 3))
+    VOTE_IDEMPOTENCY_CACHE_SIZE = int(os.environ.get('VOTE_IDEMPOTENCY_CACHE_SIZE', 10000))
+    
+    # Seconds the per-owner dashboard statistics stay cached (0 = always query)
+    DASHBOARD_STATS_TTL = int(os.environ.get('DASHBOARD_STATS_TTL', 0 if SOCKETIO_MESSAGE_QUEUE else 30))
+    
+    # Session codes: a keyed permutation of the 36^6 code space (key defaults
+    # to SECRET_KEY); each worker reserves this many codes per DB round trip
+    SESSION_CODE_KEY = os.environ.get('SESSION_CODE_KEY')
+    SESSION_CODE_BLOCK_SIZE = int(os.environ.get('SESSION_CODE_BLOCK_SIZE', 1000))
+    
+    # Logged-in users cached by id for Flask-Login (per process)
+    USER_CACHE_SIZE = int(os.environ.get('USER_CACHE_SIZE', 1024))
+    USER_CACHE_TTL = int(os.environ.get('USER_CACHE_TTL', 60))
+    
+    # Process-local session code -> metadata cache (LRU; TTL 0 = always query,
+    # since other workers can't invalidate it) and compiled slide decks
+    # (TTL 0 = kept until this process invalidates them)
+    SESSION_CACHE_SIZE = int(os.environ.get('SESSION_CACHE_SIZE', 1024))
+    SESSION_CACHE_TTL = int(os.environ.get('SESSION_CACHE_TTL', 0 if SOCKETIO_MESSAGE_QUEUE else 30))
+    DECK_CACHE_TTL = int(os.environ.get('DECK_CACHE_TTL', 10 if SOCKETIO_MESSAGE_QUEUE else 0))
+    # Compiled slide decks kept per process (least recently used go first)
+    DECK_CACHE_SIZE = int(os.environ.get('DECK_CACHE_SIZE', 500))
+    
+    # Participant presence: clients send a heartbeat every N seconds, sockets
+    # silent for PRESENCE_TIMEOUT go offline, is_online/online_count are
+    # written in batches every PRESENCE_SYNC_INTERVAL seconds
+    PRESENCE_HEARTBEAT_INTERVAL = int(os.environ.get('PRESENCE_HEARTBEAT_INTERVAL', 20))
+    PRESENCE_TIMEOUT = int(os.environ.get('PRESENCE_TIMEOUT', 60))
+    PRESENCE_SYNC_INTERVAL = float(os.environ.get('PRESENCE_SYNC_INTERVAL', 2))
+    
+    # Participant joins are inserted in batches (whichever limit comes first)
+    PARTICIPANT_FLUSH_BATCH_SIZE = int(os.environ.get('PARTICIPANT_FLUSH_BATCH_SIZE', 200))
+    PARTICIPANT_FLUSH_INTERVAL = float(os.environ.get('PARTICIPANT_FLUSH_INTERVAL', 0.2))
+    
+    # Participant-by-poll matrices kept for ended sessions (analytics reports)
+    ANALYTICS_CACHE_SIZE = int(os.environ.get('ANALYTICS_CACHE_SIZE', 32))
+    
+    # Rendered QR images kept in memory (per code, URL, size and format)
+    QR_CACHE_SIZE = int(os.environ.get('QR_CACHE_SIZE', 256))
+    
+    # Slide images: resized WebP/JPEG renditions made in the background
+    IMAGE_WORKERS = int(os.environ.get('IMAGE_WORKERS', 2))
+    IMAGE_RENDITION_WIDTHS = [int(w) for w in os.environ.get('IMAGE_RENDITION_WIDTHS', '320,640,1280').split(',') if w.strip()]
+    
+    # Uploads stored by content hash and served from /media with immutable
+    # caching. MEDIA_SENDFILE: '' (Flask sends the file), 'x-sendfile'
+    # (Apache/lighttpd) or 'x-accel' (nginx internal location MEDIA_ACCEL_PREFIX)
+    MEDIA_FOLDER = os.environ.get('MEDIA_FOLDER') or os.path.join(os.path.dirname(os.path.abspath(__file__)), 'instance', 'media')
+    MEDIA_SENDFILE = os.environ.get('MEDIA_SENDFILE', '')
+    MEDIA_ACCEL_PREFIX = os.environ.get('MEDIA_ACCEL_PREFIX', '/_media/')
+    MEDIA_MAX_AGE = int(os.environ.get('MEDIA_MAX_AGE', 365 * 24 * 3600))
+
+    # Seconds before an in-memory vote tally is re-seeded from the DB; other
+    # workers' votes only reach this process's tallies this way
+    TALLY_MAX_AGE = float(os.environ.get('TALLY_MAX_AGE', 5 if SOCKETIO_MESSAGE_QUEUE else 0))
+    # Most polls whose tallies are kept in memory (least recently used go first)
+    TALLY_CACHE_SIZE = int(os.environ.get('TALLY_CACHE_SIZE', 1000))
@@ -1,6 +1,19 @@
+import os
+from config import Config
+
+# run.py opts into green threads unless SOCKETIO_ASYNC_MODE says otherwise;
+# eventlet must patch the stdlib before Flask, SQLAlchemy or the DB driver
+# import socket/threading
+if (Config.SOCKETIO_ASYNC_MODE or 'eventlet') == 'eventlet':
+    import eventlet
+    eventlet.monkey_patch()
+
 from app import create_app, socketio
 
 app = create_app()
 
 if __name__ == '__main__':
-    socketio.run(app, debug=True, host='0.0.0.0', port=5000)
+    socketio.run(app,
+                 debug=os.environ.get('FLASK_DEBUG', '1') == '1',
+                 host=os.environ.get('HOST', '0.0.0.0'),
+                 port=int(os.environ.get('PORT', 5000)))
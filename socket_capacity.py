@@ -0,0 +1,91 @@
+"""Measure how many idle Socket.IO connections the server holds per GB of RAM.
+
+Start the server in the mode to compare, e.g.
+
+    SOCKETIO_ASYNC_MODE=eventlet python run.py
+    SOCKETIO_ASYNC_MODE=threading python run.py
+
+then open N websocket clients against it and sample the server's RSS:
+
+    python socket_capacity.py --pid <server pid> --clients 1000
+
+Clients speak raw Engine.IO/Socket.IO over websocket-client from a single
+thread, so the client side stays cheap and the numbers reflect the server.
+"""
+import argparse
+import resource
+import selectors
+import time
+
+import websocket
+
+
+def rss_bytes(pid):
+    with open(f'/proc/{pid}/status') as f:
+        for line in f:
+            if line.startswith('VmRSS:'):
+                return int(line.split()[1]) * 1024
+    return 0
+
+
+def open_socket(url, session_code=None):
+    ws = websocket.create_connection(url, timeout=10)
+    ws.recv()            # Engine.IO open packet
+    ws.send('40')        # Socket.IO connect to the default namespace
+    ws.recv()            # connect ack
+    if session_code:
+        ws.send(f'42["join_session",{{"session_code":"{session_code}"}}]')
+    return ws
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--url', default='ws://127.0.0.1:5000/socket.io/?EIO=4&transport=websocket')
+    parser.add_argument('--pid', type=int, required=True, help='server process id')
+    parser.add_argument('--clients', type=int, default=500)
+    parser.add_argument('--session-code', help='also join this session (creates participants)')
+    parser.add_argument('--hold', type=float, default=10, help='seconds to hold connections open')
+    args = parser.parse_args()
+
+    # One descriptor per client; lift the soft limit (often 1024) if needed
+    soft, hard = resource.getrlimit(resource.RLIMIT_NOFILE)
+    wanted = args.clients + 64
+    if soft != resource.RLIM_INFINITY and soft < wanted:
+        resource.setrlimit(resource.RLIMIT_NOFILE, (wanted if hard == resource.RLIM_INFINITY else min(wanted, hard), hard))
+
+    baseline = rss_bytes(args.pid)
+    sockets = []
+    started = time.monotonic()
+    for _ in range(args.clients):
+        sockets.append(open_socket(args.url, args.session_code))
+    connect_time = time.monotonic() - started
+
+    # Keep answering Engine.IO pings while holding the connections; epoll/kqueue
+    # via selectors, since select() stops at FD_SETSIZE (usually 1024) sockets
+    selector = selectors.DefaultSelector()
+    for ws in sockets:
+        selector.register(ws.sock, selectors.EVENT_READ, ws)
+    deadline = time.monotonic() + args.hold
+    while time.monotonic() < deadline:
+        for key, _ in selector.select(timeout=1):
+            ws = key.data
+            if ws.recv() == '2':
+                ws.send('3')
+    selector.close()
+
+    loaded = rss_bytes(args.pid)
+    per_socket = (loaded - baseline) / max(len(sockets), 1)
+    print(f'clients:           {len(sockets)}')
+    print(f'connect time:      {connect_time:.2f}s')
+    print(f'server RSS before: {baseline / 2**20:.1f} MiB')
+    print(f'server RSS after:  {loaded / 2**20:.1f} MiB')
+    print(f'per socket:        {per_socket / 1024:.1f} KiB')
+    if per_socket > 0:
+        print(f'sockets per GiB:   {int(2**30 / per_socket)}')
+
+    for ws in sockets:
+        ws.close()
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,97 @@
+import pytest
+from config import Config
+from app import create_app, db
+from app.models import User, Session, Poll, Participant
+
+
+def reset_services():
+    """The service singletons outlive an app; start every test from scratch"""
+    from app.services.tally import tally_engine
+    from app.services.broadcast import broadcast_scheduler
+    from app.services.vote_buffer import vote_buffer, _Batch
+    from app.services.votes import idempotency_keys
+    from app.services.session_stats import stats_cache
+    from app.services.session_resolver import session_resolver
+    from app.services.deck_cache import deck_cache
+    from app.services.codes import code_allocator
+    from app.services.user_cache import user_cache
+    from app.services.presence import presence
+    from app.services.join_buffer import join_buffer
+    from app.services.images import image_pipeline
+
+    tally_engine._tallies.clear()
+    broadcast_scheduler._dirty.clear()
+    broadcast_scheduler._emits.clear()
+    broadcast_scheduler._rooms.clear()
+    vote_buffer._batch = _Batch()
+    vote_buffer._retries = []
+    vote_buffer._keys.clear()
+    idempotency_keys._keys.clear()
+    stats_cache._entries.clear()
+    session_resolver._entries.clear()
+    deck_cache._decks.clear()
+    code_allocator._codes = []
+    user_cache._entries.clear()
+    for state in (presence._sids, presence._by_participant, presence._counts, presence._rooms,
+                  presence._deltas, presence._inflight, presence._changes):
+        state.clear()
+    join_buffer._pending.clear()
+    image_pipeline._pending.clear()
+    image_pipeline._late.clear()
+
+
+@pytest.fixture
+def make_app(tmp_path):
+    """Build an app on a fresh SQLite file, with config overrides"""
+    def make(**overrides):
+        settings = {
+            'TESTING': True,
+            'SQLALCHEMY_DATABASE_URI': f"sqlite:///{tmp_path / 'test.db'}",
+            'SOCKETIO_ASYNC_MODE': 'threading',
+            'SOCKETIO_MESSAGE_QUEUE': None,
+            'MEDIA_FOLDER': str(tmp_path / 'media'),
+            'BCRYPT_ROUNDS': 4,
+            # Background tasks would race the explicit flush()/sync() calls
+            'VOTE_FLUSH_INTERVAL': 3600,
+            'VOTE_BROADCAST_INTERVAL': 3600,
+            'PRESENCE_SYNC_INTERVAL': 3600,
+            'PARTICIPANT_FLUSH_INTERVAL': 3600,
+            'TALLY_MAX_AGE': 0,
+        }
+        settings.update(overrides)
+        config = type('TestConfig', (Config,), settings)
+
+        reset_services()
+        app = create_app(config)
+        with app.app_context():
+            db.create_all()
+        return app
+    return make
+
+
+@pytest.fixture
+def app(make_app):
+    return make_app()
+
+
+@pytest.fixture
+def make_poll():
+    """Create a session with one poll and some participants"""
+    def make(poll_type='multiple_choice', options=('A', 'B', 'C'), allow_multiple=False, participants=3):
+        user = User(username='owner', email='owner@example.com', is_active=True)
+        user.set_password('secret')
+        db.session.add(user)
+        db.session.flush()
+
+        sess = Session(code='TEST01', title='Test', user_id=user.id, is_active=True)
+        db.session.add(sess)
+        db.session.flush()
+
+        poll = Poll(session_id=sess.id, question='Q', poll_type=poll_type,
+                    options=list(options), allow_multiple=allow_multiple, slide_number=1)
+        db.session.add(poll)
+        people = [Participant(session_id=sess.id, identifier=f'p{i}') for i in range(participants)]
+        db.session.add_all(people)
+        db.session.commit()
+        return poll, [person.id for person in people]
+    return make
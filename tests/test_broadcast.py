@@ -0,0 +1,89 @@
+import pytest
+from app import db, socketio
+from app.models import Vote
+from app.services.broadcast import broadcast_scheduler
+from app.services.presence import presence
+from app.services.tally import tally_engine
+
+
+@pytest.fixture
+def emitted(monkeypatch):
+    events = []
+    monkeypatch.setattr(socketio, 'emit', lambda event, data, **kw: events.append((event, data, kw['room'])))
+    return events
+
+
+def new_votes(emitted):
+    return [(data, room) for event, data, room in emitted if event == 'new_vote']
+
+
+def vote(poll, tally, participant_id, mask):
+    db.session.add(Vote(poll_id=poll.id, participant_id=participant_id, choice_mask=mask))
+    db.session.commit()
+    tally_engine.record(tally, mask)
+    broadcast_scheduler.vote(tally)
+
+
+def test_votes_in_one_tick_become_one_new_vote(make_app, make_poll, emitted):
+    app = make_app(VOTE_BROADCAST_SNAPSHOT_EVERY=3)
+    with app.app_context():
+        poll, people = make_poll(participants=6)
+        tally = tally_engine.ensure(poll)
+
+        vote(poll, tally, people[0], 0b001)
+        vote(poll, tally, people[1], 0b010)
+        broadcast_scheduler.flush()
+        # The first emit for a poll is a full snapshot
+        assert new_votes(emitted) == [({
+            'poll_id': poll.id, 'seq': 1, 'votes': 2, 'total_votes': 2, 'answer': 'B',
+            'results': {'A': 1, 'B': 1, 'C': 0}
+        }, 'TEST01:presenter')]
+
+        emitted.clear()
+        vote(poll, tally, people[2], 0b010)
+        vote(poll, tally, people[3], 0b100)
+        broadcast_scheduler.flush()
+        assert new_votes(emitted) == [({
+            'poll_id': poll.id, 'seq': 2, 'votes': 2, 'total_votes': 4, 'answer': 'C',
+            'delta': {'B': 1, 'C': 1}
+        }, 'TEST01:presenter')]
+
+        # Nothing new: nothing sent
+        emitted.clear()
+        broadcast_scheduler.flush()
+        assert emitted == []
+
+        vote(poll, tally, people[4], 0b001)
+        broadcast_scheduler.flush()
+        vote(poll, tally, people[5], 0b001)
+        broadcast_scheduler.flush()
+        sent = [data for data, _ in new_votes(emitted)]
+        assert [data['seq'] for data in sent] == [3, 4]
+        assert sent[0]['delta'] == {'A': 1}
+        # Every third emit is a snapshot again
+        assert sent[1]['results'] == {'A': 3, 'B': 2, 'C': 1}
+
+
+def test_participant_changes_fold_into_one_count_per_room(app, make_poll, emitted):
+    with app.app_context():
+        poll, _ = make_poll()
+        broadcast_scheduler.participants('TEST01', poll.session_id, joined=1)
+        broadcast_scheduler.participants('TEST01', poll.session_id, joined=1)
+        broadcast_scheduler.participants('TEST01', poll.session_id, left=1)
+        broadcast_scheduler.flush()
+
+        count = presence.count(poll.session_id)
+        assert emitted == [
+            ('participant_count', {'count': count, 'joined': 2, 'left': 1}, 'TEST01:presenter'),
+            ('participant_count', {'count': count}, 'TEST01'),
+        ]
+
+
+def test_vote_updates_only_go_to_the_presenter_room(app, make_poll, emitted):
+    with app.app_context():
+        poll, people = make_poll()
+        tally = tally_engine.ensure(poll)
+        vote(poll, tally, people[0], 0b001)
+        broadcast_scheduler.flush()
+
+        assert [(event, room) for event, _, room in emitted] == [('new_vote', 'TEST01:presenter')]
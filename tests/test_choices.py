@@ -0,0 +1,58 @@
+import pytest
+from app.services.choices import MAX_OPTIONS, choice_counts, decode_choice, encode_choice, mask_indices
+
+OPTIONS = ['A', 'B', 'C', 'D']
+
+
+def test_encode_by_text_and_by_index_agree():
+    assert encode_choice(OPTIONS, 'C') == 0b100
+    assert encode_choice(OPTIONS, indices=2) == 0b100
+    assert encode_choice(OPTIONS, indices=[2]) == 0b100
+
+
+def test_encode_multiple():
+    assert encode_choice(OPTIONS, ['A', 'D'], allow_multiple=True) == 0b1001
+    assert encode_choice(OPTIONS, indices=[3, 0, 3], allow_multiple=True) == 0b1001
+
+
+@pytest.mark.parametrize('kwargs, message', [
+    ({'answer': 'E'}, 'Unknown option'),
+    ({'indices': [4]}, 'Unknown option'),
+    ({'indices': [-1]}, 'Unknown option'),
+    ({'indices': [True]}, 'Unknown option'),
+    ({'indices': ['1']}, 'Unknown option'),
+    ({'indices': []}, 'No option selected'),
+    ({'answer': ['A', 'B']}, 'Only one option may be selected'),
+])
+def test_encode_rejects(kwargs, message):
+    with pytest.raises(ValueError, match=message):
+        encode_choice(OPTIONS, **kwargs)
+
+
+def test_encode_caps_options_at_mask_width():
+    options = [str(i) for i in range(MAX_OPTIONS + 5)]
+    assert encode_choice(options, indices=MAX_OPTIONS - 1) == 1 << (MAX_OPTIONS - 1)
+    with pytest.raises(ValueError):
+        encode_choice(options, indices=MAX_OPTIONS)
+
+
+def test_mask_decoding():
+    assert mask_indices(0) == []
+    assert mask_indices(0b1011) == [0, 1, 3]
+    assert mask_indices(1 << (MAX_OPTIONS - 1)) == [MAX_OPTIONS - 1]
+    assert decode_choice(OPTIONS, 0b1010) == ['B', 'D']
+    assert decode_choice(OPTIONS, None) == []
+    # Bits past the current options (an option was removed) are ignored
+    assert decode_choice(OPTIONS, 0b110001) == ['A']
+
+
+def test_choice_counts_matches_per_vote_loop():
+    masks = [0b001, 0b011, 0b110, 0b100]
+    weights = [5, 2, 3, 1]
+    expected = [0, 0, 0]
+    for mask, weight in zip(masks, weights):
+        for index in mask_indices(mask):
+            expected[index] += weight
+    assert choice_counts(3, masks, weights).tolist() == expected
+    assert choice_counts(3, masks).tolist() == [2, 2, 2]
+    assert choice_counts(3, []).tolist() == [0, 0, 0]
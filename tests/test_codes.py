@@ -0,0 +1,63 @@
+import pytest
+from app import db
+from app.models import Session, User
+from app.services.codes import (CODE_ALPHABET, CODE_LENGTH, CODE_SPACE, CodePermutation,
+                                code_allocator, encode_code)
+
+
+def test_permutation_is_injective_and_in_range():
+    permutation = CodePermutation('key')
+    values = [permutation(index) for index in range(20000)]
+    assert len(set(values)) == len(values)
+    assert all(0 <= value < CODE_SPACE for value in values)
+    assert permutation(CODE_SPACE - 1) < CODE_SPACE
+
+
+def test_permutation_depends_on_key():
+    first, second = CodePermutation('key'), CodePermutation(b'key')
+    other = CodePermutation('other key')
+    indices = range(100)
+    assert [first(i) for i in indices] == [second(i) for i in indices]
+    assert [first(i) for i in indices] != [other(i) for i in indices]
+
+
+def test_permutation_rejects_out_of_range():
+    permutation = CodePermutation('key')
+    with pytest.raises(ValueError):
+        permutation(CODE_SPACE)
+    with pytest.raises(ValueError):
+        permutation(-1)
+
+
+def test_encode_code():
+    assert encode_code(0) == '000000'
+    assert encode_code(CODE_SPACE - 1) == 'ZZZZZZ'
+    code = encode_code(123456789)
+    assert len(code) == CODE_LENGTH and set(code) <= set(CODE_ALPHABET)
+    assert int(code, 36) == 123456789
+
+
+def test_allocator_hands_out_unique_codes_across_blocks(make_app):
+    app = make_app(SESSION_CODE_BLOCK_SIZE=50)
+    with app.app_context():
+        codes = [code_allocator.allocate() for _ in range(175)]
+    assert len(set(codes)) == len(codes)
+    assert all(len(code) == CODE_LENGTH for code in codes)
+
+
+def test_allocator_skips_codes_already_taken(make_app):
+    app = make_app(SESSION_CODE_BLOCK_SIZE=10)
+    with app.app_context():
+        # Codes the first block will produce, in order
+        block = [encode_code(code_allocator.permutation(index)) for index in range(10)]
+        user = User(username='owner', email='owner@example.com')
+        user.set_password('secret')
+        db.session.add(user)
+        db.session.flush()
+        db.session.add(Session(code=block[0], title='Old random code', user_id=user.id))
+        db.session.commit()
+
+        codes = [code_allocator.allocate() for _ in range(9)]
+        assert codes == block[1:]
+        # The next block comes from the counter, not from a retry
+        assert code_allocator.allocate() == encode_code(code_allocator.permutation(10))
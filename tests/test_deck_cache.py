@@ -0,0 +1,31 @@
+from app import db
+from app.models import Session, Poll
+from app.services.deck_cache import deck_cache
+
+
+def test_slides_come_from_the_compiled_deck(app, make_poll):
+    with app.app_context():
+        poll, _ = make_poll()
+        payload = deck_cache.slide(poll.session_id, 0)
+        assert payload['id'] == poll.id
+        assert payload['total_votes'] == 0
+        assert deck_cache.slide_number(poll.session_id, 1)['id'] == poll.id
+        assert deck_cache.slide(poll.session_id, 1) is None
+
+
+def test_least_recently_used_decks_are_evicted(make_app, make_poll):
+    app = make_app(DECK_CACHE_SIZE=1)
+    with app.app_context():
+        poll, _ = make_poll()
+        other = Session(code='TEST02', title='Other', user_id=poll.session.user_id, is_active=True)
+        db.session.add(other)
+        db.session.flush()
+        db.session.add(Poll(session_id=other.id, question='Q', poll_type='multiple_choice',
+                            options=['A', 'B'], slide_number=1))
+        db.session.commit()
+
+        deck_cache.get(poll.session_id)
+        deck_cache.get(other.id)
+        assert list(deck_cache._decks) == [other.id]
+        assert deck_cache.slide(poll.session_id, 0)['id'] == poll.id
+        assert list(deck_cache._decks) == [poll.session_id]
@@ -0,0 +1,74 @@
+import io
+import pytest
+from PIL import Image
+from werkzeug.datastructures import FileStorage
+from app import db
+from app.models import Poll, UploadBlob
+from app.services import images
+from app.services.images import image_pipeline
+from app.services.media import media_store
+
+
+@pytest.fixture
+def image_poll(app, make_poll):
+    """A poll showing a freshly stored PNG whose renditions are not made yet"""
+    data = io.BytesIO()
+    Image.new('RGB', (800, 400), 'red').save(data, 'PNG')
+    with app.app_context():
+        poll, _ = make_poll()
+        blob = media_store.store(FileStorage(stream=data, filename='slide.png'), 'png')
+        poll.image_url = blob.url
+        db.session.commit()
+        yield poll, blob.digest, media_store.path(blob.filename)
+
+
+def add_poll(session_id, image_url, number):
+    poll = Poll(session_id=session_id, question=f'Q{number}', poll_type='multiple_choice',
+                options=['A', 'B'], slide_number=number, image_url=image_url)
+    db.session.add(poll)
+    db.session.commit()
+    return poll.id
+
+
+def renditions_of(poll_id):
+    db.session.expire_all()
+    return db.session.get(Poll, poll_id).image_renditions
+
+
+def test_renditions_reach_polls_created_while_processing(image_poll, monkeypatch):
+    poll, digest, path = image_poll
+    finish = image_pipeline._finish
+    late = []
+
+    def finish_then_create(digest, renditions):
+        finish(digest, renditions)
+        if not late:
+            # Committed after the pass above looked the polls up
+            late.append(add_poll(poll.session_id, poll.image_url, 2))
+            image_pipeline.submit(digest, path)
+
+    monkeypatch.setattr(image_pipeline, '_finish', finish_then_create)
+    image_pipeline._pending.add(digest)
+    image_pipeline._process(digest, path)
+
+    renditions = renditions_of(poll.id)
+    assert [item['width'] for item in renditions['webp']] == [320, 640, 800]
+    assert renditions_of(late[0]) == renditions
+    assert not image_pipeline._pending and not image_pipeline._late
+
+
+def test_finished_blobs_are_not_resized_again(image_poll, monkeypatch):
+    poll, digest, path = image_poll
+    image_pipeline._pending.add(digest)
+    image_pipeline._process(digest, path)
+
+    # Created after processing finished, from a blob read before that
+    other = add_poll(poll.session_id, poll.image_url, 2)
+
+    def no_render(*args):
+        raise AssertionError('resized twice')
+
+    monkeypatch.setattr(images, 'render_renditions', no_render)
+    image_pipeline._pending.add(digest)
+    image_pipeline._process(digest, path)
+    assert renditions_of(other) == db.session.get(UploadBlob, digest).renditions
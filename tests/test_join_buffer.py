@@ -0,0 +1,63 @@
+import pytest
+from app import db, socketio
+from app.models import Participant
+from app.services.broadcast import broadcast_scheduler
+from app.services.join_buffer import join_buffer
+
+
+@pytest.fixture
+def emitted(monkeypatch):
+    events = []
+    monkeypatch.setattr(socketio, 'emit', lambda event, data, **kw: events.append((event, data, kw)))
+    return events
+
+
+def test_one_flush_answers_every_queued_join(app, make_poll, emitted):
+    with app.app_context():
+        poll, _ = make_poll(participants=1)
+
+        join_buffer.submit('sid-new', 'TEST01')
+        join_buffer.submit('sid-back', 'TEST01', 'p0')
+        join_buffer.submit('sid-gone', 'TEST01')
+        assert join_buffer.cancel('sid-gone')
+        join_buffer.submit('sid-bad', 'NOPE00')
+        assert join_buffer.flush() == 3
+
+        replies = {kw['to']: (event, data) for event, data, kw in emitted}
+        assert replies['sid-bad'] == ('error', {'message': 'Invalid session'})
+        event, data = replies['sid-back']
+        assert event == 'session_joined'
+        assert data['participant_identifier'] == 'p0'
+        assert data['current_poll']['id'] == poll.id
+        event, data = replies['sid-new']
+        assert event == 'session_joined'
+        assert db.session.get(Participant, data['participant_id']).identifier == data['participant_identifier']
+        assert 'sid-gone' not in replies
+
+        # Both joins fold into one participant_count for the room
+        assert broadcast_scheduler._rooms == {'TEST01': [poll.session_id, 2, 0]}
+        assert join_buffer.flush() == 0
+
+
+def test_full_batch_flushes_on_submit(make_app, make_poll, emitted):
+    app = make_app(PARTICIPANT_FLUSH_BATCH_SIZE=2)
+    with app.app_context():
+        make_poll(participants=0)
+        join_buffer.submit('a', 'TEST01')
+        assert emitted == []
+        join_buffer.submit('b', 'TEST01')
+        assert sorted(kw['to'] for _, _, kw in emitted) == ['a', 'b']
+        assert Participant.query.count() == 2
+
+
+def test_failed_flush_tells_sockets_to_retry(app, make_poll, emitted, monkeypatch):
+    with app.app_context():
+        make_poll(participants=0)
+
+        def broken(joins):
+            raise RuntimeError('database is down')
+
+        monkeypatch.setattr(join_buffer, '_process', broken)
+        join_buffer.submit('a', 'TEST01')
+        join_buffer.flush()
+        assert emitted == [('join_failed', {'message': 'Join failed, please retry'}, {'to': 'a'})]
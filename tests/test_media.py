@@ -0,0 +1,101 @@
+import hashlib
+import io
+import os
+from werkzeug.datastructures import FileStorage
+from app import db
+from app.models import UploadBlob, User
+from app.services.media import media_store
+
+
+def upload(data, name='slide.png'):
+    return FileStorage(stream=io.BytesIO(data), filename=name)
+
+
+def test_same_content_is_stored_once(app):
+    with app.app_context():
+        first = media_store.store(upload(b'image bytes'), 'png')
+        second = media_store.store(upload(b'image bytes', 'copy.png'), 'png')
+        other = media_store.store(upload(b'other bytes'), 'png')
+        db.session.commit()
+
+        assert first.digest == second.digest != other.digest
+        assert db.session.get(UploadBlob, first.digest).ref_count == 2
+        assert db.session.get(UploadBlob, other.digest).ref_count == 1
+        with open(media_store.path(first.filename), 'rb') as f:
+            assert f.read() == b'image bytes'
+
+
+def test_release_returns_files_once_unreferenced(app):
+    with app.app_context():
+        blob = media_store.store(upload(b'image bytes'), 'png')
+        media_store.store(upload(b'image bytes'), 'png')
+        db.session.commit()
+        url, path = blob.url, media_store.path(blob.filename)
+
+        assert media_store.release({url: 1}) == []
+        db.session.commit()
+        assert db.session.get(UploadBlob, blob.digest).ref_count == 1
+
+        assert media_store.release({url: 1}) == [path]
+        db.session.commit()
+        assert db.session.get(UploadBlob, blob.digest) is None
+
+        media_store.discard(path)
+        assert not os.path.exists(path)
+
+
+def test_release_counts_every_poll_using_a_file(app):
+    with app.app_context():
+        blob = media_store.store(upload(b'image bytes'), 'png')
+        for _ in range(2):
+            media_store.store(upload(b'image bytes'), 'png')
+        db.session.commit()
+
+        assert media_store.release({blob.url: 3}) == [media_store.path(blob.filename)]
+
+
+def test_concurrent_first_upload_adds_a_reference(app, monkeypatch):
+    with app.app_context():
+        digest = hashlib.sha256(b'image bytes').hexdigest()
+        real_get = db.session.get
+
+        def racing_get(model, key, **kw):
+            if model is UploadBlob and not racing_get.raced:
+                # Another request stores the same file between lookup and INSERT
+                racing_get.raced = True
+                with db.engine.begin() as connection:
+                    connection.execute(UploadBlob.__table__.insert().values(
+                        digest=digest, ext='png', size=11, ref_count=1))
+                return None
+            return real_get(model, key, **kw)
+
+        racing_get.raced = False
+        monkeypatch.setattr(db.session, 'get', racing_get)
+        blob = media_store.store(upload(b'image bytes'), 'png')
+        db.session.commit()
+
+        assert blob.digest == digest
+        db.session.expire_all()
+        assert real_get(UploadBlob, digest).ref_count == 2
+
+
+def test_deleting_a_user_releases_its_images(app, make_poll):
+    client = app.test_client()
+    with app.app_context():
+        poll, _ = make_poll()
+        blob = media_store.store(upload(b'image bytes'), 'png')
+        poll.image_url = blob.url
+        admin = User(username='admin', email='admin@example.com', is_admin=True, is_active=True)
+        admin.set_password('secret')
+        db.session.add(admin)
+        db.session.commit()
+        path, owner_id = media_store.path(blob.filename), poll.session.user_id
+
+        with client.session_transaction() as session:
+            session['_user_id'] = str(admin.id)
+        response = client.post('/admin/users', data={'action': 'delete', 'user_id': owner_id})
+        assert response.status_code == 302
+
+        db.session.expire_all()
+        assert db.session.get(UploadBlob, blob.digest) is None
+        assert not os.path.exists(path)
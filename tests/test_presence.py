@@ -0,0 +1,73 @@
+from app import db
+from app.models import Session, Participant
+from app.services.presence import presence
+
+
+def online_state(session_id):
+    db.session.expire_all()
+    flags = dict(db.session.query(Participant.identifier, Participant.is_online).filter_by(session_id=session_id))
+    return db.session.get(Session, session_id).online_count, flags
+
+
+def join(sid, poll, participant_id):
+    return presence.join(sid, poll.session_id, participant_id, 'TEST01', poll.session.user_id)
+
+
+def test_joins_and_leaves_are_synced_in_one_batch(app, make_poll):
+    with app.app_context():
+        poll, people = make_poll()
+        assert join('s0', poll, people[0])
+        assert join('s1', poll, people[1])
+        # A reconnect moves the participant over without counting it again
+        assert not join('s1b', poll, people[1])
+        assert presence.count(poll.session_id) == 2
+
+        assert presence.sync() == [poll.session_id]
+        assert online_state(poll.session_id) == (2, {'p0': True, 'p1': True, 'p2': False})
+
+        presence.leave('s0')
+        presence.leave('s1')  # replaced socket, already gone
+        assert presence.count(poll.session_id) == 1
+        presence.sync()
+        assert online_state(poll.session_id) == (1, {'p0': False, 'p1': True, 'p2': False})
+
+
+def test_boot_resets_what_a_crashed_process_left_online(app, make_poll):
+    with app.app_context():
+        poll, people = make_poll()
+        # make_poll's participants start out online, the counter drifted
+        db.session.query(Session).update({'online_count': 7})
+        db.session.commit()
+
+        assert presence.count(poll.session_id) == 0
+        assert online_state(poll.session_id) == (0, {'p0': False, 'p1': False, 'p2': False})
+
+        join('s0', poll, people[0])
+        presence.sync()
+        assert online_state(poll.session_id)[0] == 1
+
+
+def test_flags_already_set_by_another_worker_are_not_counted_again(app, make_poll):
+    with app.app_context():
+        presence.shared = True
+        poll, people = make_poll()
+        db.session.query(Session).update({'online_count': 7})
+        db.session.query(Participant).filter(Participant.id != people[0]).update({'is_online': False})
+        db.session.commit()
+
+        # Boot recounts from the flags instead of trusting the counter
+        assert presence.count(poll.session_id) == 1
+
+        # p0 is online through another worker; only p1 really comes online
+        join('s0', poll, people[0])
+        join('s1', poll, people[1])
+        assert presence.sync() == [poll.session_id]
+        assert online_state(poll.session_id) == (2, {'p0': True, 'p1': True, 'p2': False})
+
+        # The other worker already synced p0 going offline; our leave is a no-op
+        db.session.query(Participant).filter_by(id=people[0]).update({'is_online': False})
+        db.session.query(Session).update({'online_count': Session.online_count - 1})
+        db.session.commit()
+        presence.leave('s0')
+        assert presence.sync() == []
+        assert online_state(poll.session_id) == (1, {'p0': False, 'p1': True, 'p2': False})
@@ -0,0 +1,141 @@
+from app import db
+from app.models import Poll, Vote
+from app.services.tally import tally_engine
+
+
+def add_votes(poll, participant_ids, masks=None, answers=None):
+    for i, participant_id in enumerate(participant_ids):
+        db.session.add(Vote(poll_id=poll.id, participant_id=participant_id,
+                            choice_mask=masks[i] if masks else None,
+                            answer=answers[i] if answers else None))
+    db.session.commit()
+
+
+def test_seed_record_and_drain(app, make_poll):
+    with app.app_context():
+        poll, people = make_poll(allow_multiple=True, participants=4)
+        # Legacy rows without a mask still count by option text
+        add_votes(poll, people[:2], masks=[0b011, None], answers=[None, 'C'])
+
+        tally = tally_engine.ensure(poll)
+        assert tally.total == 2
+        assert tally_engine.results(poll) == {'A': 1, 'B': 1, 'C': 1}
+        # Seeding is not a change to broadcast
+        assert tally_engine.drain(poll.id) is None
+
+        add_votes(poll, people[2:3], masks=[0b110])
+        assert tally_engine.record(tally, 0b110) == ('B', 'C')
+
+        drained = tally_engine.drain(poll.id)
+        assert drained['votes'] == 1
+        assert drained['total_votes'] == 3
+        assert drained['answer'] == 'B, C'
+        assert drained['delta'] == {'B': 1, 'C': 1}
+        assert drained['results'] is None
+        assert tally_engine.drain(poll.id) is None
+
+
+def test_drain_full_includes_matching_results(app, make_poll):
+    with app.app_context():
+        poll, people = make_poll()
+        tally = tally_engine.ensure(poll)
+        add_votes(poll, people[:1], masks=[0b001])
+        tally_engine.record(tally, 0b001)
+
+        drained = tally_engine.drain(poll.id, full=True)
+        assert drained['results'] == {'A': 1, 'B': 0, 'C': 0}
+        assert drained['total_votes'] == sum(drained['results'].values())
+
+
+def test_reseed_keeps_undrained_votes_and_forces_results(app, make_poll):
+    with app.app_context():
+        poll, people = make_poll()
+        tally = tally_engine.ensure(poll)
+        add_votes(poll, people[:1], masks=[0b001])
+        tally_engine.record(tally, 0b001)
+
+        # Another worker's vote, only visible through the database
+        add_votes(poll, people[1:2], masks=[0b010])
+        reseeded = tally_engine.reconcile(poll)
+        assert reseeded is not tally
+        assert reseeded.total == 2
+
+        drained = tally_engine.drain(poll.id)
+        assert drained['votes'] == 1
+        assert drained['results'] == {'A': 1, 'B': 1, 'C': 0}
+        assert tally_engine.drain(poll.id) is None
+
+
+def test_stale_tally_reseeds_after_max_age(make_app, make_poll):
+    app = make_app(TALLY_MAX_AGE=0.01)
+    with app.app_context():
+        poll, people = make_poll()
+        assert tally_engine.ensure(poll).total == 0
+        add_votes(poll, people[:2], masks=[0b001, 0b100])
+        tally_engine._tallies[poll.id].seeded_at -= 1
+        assert tally_engine.ensure(poll).total == 2
+
+
+def test_open_ended_keeps_only_the_total(app, make_poll):
+    with app.app_context():
+        poll, people = make_poll(poll_type='open_ended', options=())
+        add_votes(poll, people, answers=['one', 'two', 'three'])
+
+        tally = tally_engine.ensure(poll)
+        assert tally.total == 3
+        assert tally.results() is None
+        assert db.session.get(Poll, poll.id).get_results() == ['one', 'two', 'three']
+
+
+def test_seed_query_runs_without_the_engine_lock(app, make_poll, monkeypatch):
+    with app.app_context():
+        poll, _ = make_poll()
+        load = tally_engine._load
+
+        def checked_load(p):
+            assert not tally_engine._lock.locked()
+            return load(p)
+
+        monkeypatch.setattr(tally_engine, '_load', checked_load)
+        assert tally_engine.ensure(poll).total == 0
+        assert tally_engine.reconcile(poll).total == 0
+
+
+def test_least_recently_used_tallies_are_evicted(make_app, make_poll):
+    app = make_app(TALLY_CACHE_SIZE=2)
+    with app.app_context():
+        first, people = make_poll()
+        polls = [first] + [Poll(session_id=first.session_id, question=f'Q{n}', poll_type='multiple_choice',
+                                options=['A', 'B'], slide_number=n) for n in (2, 3)]
+        db.session.add_all(polls[1:])
+        db.session.commit()
+
+        tallies = [tally_engine.ensure(poll) for poll in polls[:2]]
+        # A vote makes the first poll the most recently used
+        add_votes(first, people[:1], masks=[0b001])
+        tally_engine.record(tallies[0], 0b001)
+        tally_engine.drain(first.id)
+
+        tally_engine.ensure(polls[2])
+        assert set(tally_engine._tallies) == {first.id, polls[2].id}
+        assert tally_engine.ensure(first) is tallies[0]
+        # The evicted poll comes back seeded from the database
+        assert tally_engine.ensure(polls[1]).total == 0
+
+
+def test_undrained_tallies_are_not_evicted(make_app, make_poll):
+    app = make_app(TALLY_CACHE_SIZE=1)
+    with app.app_context():
+        first, people = make_poll()
+        second = Poll(session_id=first.session_id, question='Q2', poll_type='multiple_choice',
+                      options=['A', 'B'], slide_number=2)
+        db.session.add(second)
+        db.session.commit()
+
+        tally = tally_engine.ensure(first)
+        add_votes(first, people[:1], masks=[0b001])
+        tally_engine.record(tally, 0b001)
+
+        tally_engine.ensure(second)
+        assert first.id in tally_engine._tallies
+        assert tally_engine.drain(first.id)['votes'] == 1
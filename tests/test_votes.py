@@ -0,0 +1,234 @@
+from datetime import datetime
+import pytest
+from app import db
+from app.models import Poll, Vote
+from app.services import votes
+from app.services.tally import tally_engine
+from app.services.vote_buffer import vote_buffer
+from app.services.votes import insert_votes
+
+
+def row(poll_id, participant_id, mask=0b001):
+    return {'poll_id': poll_id, 'participant_id': participant_id, 'answer': None,
+            'choice_mask': mask, 'voted_at': datetime.utcnow()}
+
+
+def post_vote(client, poll_id, participant_id, answer='A', **extra):
+    return client.post('/api/vote', json=dict(poll_id=poll_id, participant_id=participant_id,
+                                             answer=answer, **extra))
+
+
+def vote_state(poll_id):
+    # Flushes commit through their own app context and session
+    db.session.expire_all()
+    poll = db.session.get(Poll, poll_id)
+    return Vote.query.filter_by(poll_id=poll_id).count(), poll.vote_count, tally_engine.results(poll)
+
+
+def test_insert_votes_returns_only_new_rows(app, make_poll):
+    with app.app_context():
+        poll, people = make_poll()
+        assert len(insert_votes([row(poll.id, people[0])])) == 1
+
+        rows = [row(poll.id, people[0], 0b010), row(poll.id, people[1]), row(poll.id, people[2])]
+        written = insert_votes(rows)
+        assert [r['participant_id'] for r in written] == people[1:]
+        assert insert_votes([row(poll.id, people[1])]) == []
+        assert db.session.get(Poll, poll.id).vote_count == 3
+
+
+def test_sync_rejects_duplicates(app, make_poll):
+    client = app.test_client()
+    with app.app_context():
+        poll, people = make_poll()
+
+        assert post_vote(client, poll.id, people[0], 'A').status_code == 200
+        response = post_vote(client, poll.id, people[0], 'B')
+        assert response.status_code == 400
+        assert response.json == {'error': 'Already voted'}
+        assert vote_state(poll.id) == (1, 1, {'A': 1, 'B': 0, 'C': 0})
+
+
+def test_sync_idempotent_retry(app, make_poll):
+    client = app.test_client()
+    with app.app_context():
+        poll, people = make_poll()
+        first = post_vote(client, poll.id, people[0], 'A', idempotency_key='k1')
+        retry = post_vote(client, poll.id, people[0], 'A', idempotency_key='k1')
+        assert first.json == {'success': True}
+        assert retry.json == {'success': True, 'duplicate': True}
+        assert vote_state(poll.id)[0] == 1
+
+
+def test_idempotency_keys_are_scoped_to_the_vote(app, make_poll):
+    client = app.test_client()
+    with app.app_context():
+        poll, people = make_poll()
+        assert post_vote(client, poll.id, people[0], 'A', idempotency_key='same').json == {'success': True}
+        # Another participant reusing the key still gets its vote recorded
+        assert post_vote(client, poll.id, people[1], 'B', idempotency_key='same').json == {'success': True}
+        # A second vote under a new key is a repeat, not a retry
+        response = post_vote(client, poll.id, people[0], 'C', idempotency_key='other')
+        assert response.status_code == 400
+        assert response.json == {'error': 'Already voted'}
+        # Keys are only looked at once the vote itself is valid
+        assert post_vote(client, poll.id, people[0], 'D', idempotency_key='same').status_code == 400
+        assert vote_state(poll.id) == (2, 2, {'A': 1, 'B': 1, 'C': 0})
+
+
+@pytest.fixture
+def write_behind(make_app):
+    return make_app(VOTE_WRITE_MODE='write_behind')
+
+
+def test_write_behind_counts_after_flush(write_behind, make_poll):
+    client = write_behind.test_client()
+    with write_behind.app_context():
+        poll, people = make_poll()
+        assert post_vote(client, poll.id, people[0], 'A').status_code == 200
+        assert post_vote(client, poll.id, people[1], 'B').status_code == 200
+        # Queued only: nothing counted or broadcast yet
+        assert vote_state(poll.id) == (0, 0, {'A': 0, 'B': 0, 'C': 0})
+
+        assert vote_buffer.flush() == 2
+        assert vote_state(poll.id) == (2, 2, {'A': 1, 'B': 1, 'C': 0})
+        assert tally_engine.drain(poll.id)['votes'] == 2
+
+
+def test_write_behind_rejects_pending_and_committed_duplicates(write_behind, make_poll):
+    client = write_behind.test_client()
+    with write_behind.app_context():
+        poll, people = make_poll()
+        assert post_vote(client, poll.id, people[0], 'A').status_code == 200
+        assert post_vote(client, poll.id, people[0], 'B').status_code == 400
+        vote_buffer.flush()
+
+        response = post_vote(client, poll.id, people[0], 'C')
+        assert response.status_code == 400
+        assert response.json == {'error': 'Already voted'}
+        # A key only matches the vote it was sent with
+        assert post_vote(client, poll.id, people[0], 'C', idempotency_key='k1').status_code == 400
+
+        assert post_vote(client, poll.id, people[1], 'B', idempotency_key='k2').status_code == 200
+        vote_buffer.flush()
+        retry = post_vote(client, poll.id, people[1], 'B', idempotency_key='k2')
+        assert retry.json == {'success': True, 'duplicate': True}
+
+        vote_buffer.flush()
+        assert vote_state(poll.id) == (2, 2, {'A': 1, 'B': 1, 'C': 0})
+
+
+def test_write_behind_flush_skips_rows_the_insert_ignored(write_behind, make_poll):
+    with write_behind.app_context():
+        poll, people = make_poll()
+        # Committed by another worker after this one accepted the vote
+        insert_votes([row(poll.id, people[0], 0b100)])
+        vote_buffer.submit(poll.id, people[0], None, 0b001)
+        vote_buffer.submit(poll.id, people[1], None, 0b010)
+
+        assert vote_buffer.flush() == 1
+        assert vote_state(poll.id) == (2, 2, {'A': 0, 'B': 1, 'C': 1})
+
+
+def test_write_behind_retries_failed_flush(write_behind, make_poll, monkeypatch):
+    client = write_behind.test_client()
+    with write_behind.app_context():
+        poll, people = make_poll()
+        assert post_vote(client, poll.id, people[0], 'A').status_code == 200
+
+        real_insert = votes.insert_votes
+        failures = []
+
+        def flaky_insert(rows):
+            if not failures:
+                failures.append(rows)
+                raise RuntimeError('database unavailable')
+            return real_insert(rows)
+
+        monkeypatch.setattr(votes, 'insert_votes', flaky_insert)
+        assert vote_buffer.flush() == 0
+        assert vote_state(poll.id) == (0, 0, {'A': 0, 'B': 0, 'C': 0})
+        # Still pending, so a repeat is still rejected
+        assert post_vote(client, poll.id, people[0], 'B').status_code == 400
+
+        assert vote_buffer.flush() == 1
+        assert vote_state(poll.id) == (1, 1, {'A': 1, 'B': 0, 'C': 0})
+
+
+def test_write_behind_drops_batch_after_retries(make_app, make_poll, monkeypatch):
+    app = make_app(VOTE_WRITE_MODE='write_behind', VOTE_FLUSH_RETRIES=2)
+    with app.app_context():
+        poll, people = make_poll()
+        vote_buffer.submit(poll.id, people[0], None, 0b001)
+
+        def broken_insert(rows):
+            raise RuntimeError('database unavailable')
+
+        monkeypatch.setattr(votes, 'insert_votes', broken_insert)
+        vote_buffer.flush()
+        vote_buffer.flush()
+        assert not vote_buffer._keys
+        assert vote_buffer.flush() == 0
+        assert vote_state(poll.id) == (0, 0, {'A': 0, 'B': 0, 'C': 0})
+
+
+def test_vote_ids_are_validated_before_anything_is_written(write_behind, make_poll):
+    client = write_behind.test_client()
+    with write_behind.app_context():
+        poll, people = make_poll()
+        assert post_vote(client, poll.id, None).status_code == 400
+        assert post_vote(client, poll.id, 'p0').status_code == 400
+        assert post_vote(client, None, people[0]).status_code == 400
+        assert post_vote(client, poll.id + 1, people[0]).status_code == 404
+        assert post_vote(client, poll.id, people[-1] + 1).status_code == 404
+        assert vote_buffer._batch.rows == []
+
+
+def test_one_refused_row_does_not_drop_the_batch(write_behind, make_poll):
+    with write_behind.app_context():
+        poll, people = make_poll()
+        for participant_id in people[:2]:
+            vote_buffer.submit(poll.id, participant_id, None, 0b001)
+        # Bypasses the route's validation; NOT NULL fails the bulk INSERT
+        batch = vote_buffer.submit(poll.id, None, None, 0b010)
+        vote_buffer.submit(poll.id, people[2], None, 0b100)
+
+        assert vote_buffer.flush() == 3
+        assert vote_state(poll.id) == (3, 3, {'A': 2, 'B': 0, 'C': 1})
+        assert batch.rejected == {(poll.id, None)}
+        assert not vote_buffer.wait(batch, poll.id, None)
+        assert vote_buffer.wait(batch, poll.id, people[0])
+        assert not vote_buffer._keys
+        assert vote_buffer.flush() == 0
+
+
+def test_strict_mode_waits_for_the_commit(make_app, make_poll):
+    app = make_app(VOTE_WRITE_MODE='write_behind', VOTE_DURABILITY='strict', VOTE_FLUSH_BATCH_SIZE=1)
+    client = app.test_client()
+    with app.app_context():
+        poll, people = make_poll()
+        # A batch of one is written by the request that fills it
+        assert post_vote(client, poll.id, people[0], 'B').json == {'success': True}
+        assert vote_state(poll.id) == (1, 1, {'A': 0, 'B': 1, 'C': 0})
+
+
+def test_word_cloud_answers_must_be_text(app, make_poll):
+    client = app.test_client()
+    with app.app_context():
+        poll, people = make_poll(poll_type='word_cloud', options=())
+        assert post_vote(client, poll.id, people[0], 5).status_code == 400
+        assert post_vote(client, poll.id, people[0], '   ').status_code == 400
+        assert post_vote(client, poll.id, people[0], 'x' * 501).status_code == 400
+        assert post_vote(client, poll.id, people[0], ' A.I. ').status_code == 200
+        assert vote_state(poll.id) == (1, 1, {'ai': 1})
+
+
+def test_text_polls_need_an_answer(app, make_poll):
+    client = app.test_client()
+    with app.app_context():
+        poll, people = make_poll(poll_type='open_ended', options=())
+        response = post_vote(client, poll.id, people[0], None)
+        assert response.status_code == 400
+        assert response.json == {'error': 'Answer is required'}
+        assert post_vote(client, poll.id, people[0], 'Lebih banyak contoh').status_code == 200
+        assert Vote.query.filter_by(poll_id=poll.id).one().answer == 'Lebih banyak contoh'